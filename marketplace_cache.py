@@ -0,0 +1,141 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Scryfall Cache
+
+Bounded cache for Scryfall lookups:
+  - at most max_entries cards, least recently used evicted first
+  - entries expire after ttl seconds (cards Scryfall could not find are
+    remembered too, for the shorter negative_ttl)
+  - every write goes straight to a small SQLite file, one row per entry,
+    so nothing is lost on restart and the file is never rewritten whole
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+class ScryfallCache:
+    """TTL + LRU cache of Scryfall card data keyed by enrichment key
+
+    lookup() returns (found, data); data is None for a cached "not found".
+    """
+
+    def __init__(self, db_path, max_entries=20000, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 legacy_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        self._entries = OrderedDict()    # key -> (expires, data), least recently used first
+        self._lock = threading.Lock()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires REAL NOT NULL, data TEXT)'
+        )
+        self._load(legacy_path)
+
+    def _load(self, legacy_path):
+        now = time.time()
+        self._conn.execute('DELETE FROM entries WHERE expires <= ?', (now,))
+        rows = self._conn.execute('SELECT key, expires, data FROM entries ORDER BY expires').fetchall()
+        if not rows and legacy_path is not None and Path(legacy_path).exists():
+            rows = self._import_legacy(legacy_path, now)
+        for key, expires, data in rows[-self.max_entries:]:
+            self._entries[key] = (expires, json.loads(data) if data is not None else None)
+        if len(rows) > self.max_entries:
+            self._conn.executemany('DELETE FROM entries WHERE key = ?',
+                                   [(key,) for key, _, _ in rows[:-self.max_entries]])
+
+    def _import_legacy(self, legacy_path, now):
+        """Rows from the old scryfall_cache.json ({key: {data, timestamp}})"""
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except:
+            return []
+        rows = []
+        for key, entry in legacy.items():
+            if not isinstance(entry, dict) or not entry.get('data'):
+                continue
+            expires = entry.get('timestamp', 0) + self.ttl
+            if expires > now:
+                rows.append((key, expires, json.dumps(entry['data'])))
+        rows.sort(key=lambda row: row[1])
+        self._conn.execute('BEGIN')
+        self._conn.executemany('INSERT OR REPLACE INTO entries (key, expires, data) VALUES (?, ?, ?)', rows)
+        self._conn.execute('COMMIT')
+        return rows
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.lookup(key, count=False)[0]
+
+    def lookup(self, key, count=True):
+        """(True, data) for a fresh entry, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                self._remove(key)
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if count:
+                self.stats['hits' if entry[1] is not None else 'negative_hits'] += 1
+            return True, entry[1]
+
+    def put(self, key, data):
+        """Cache card data (None records that the card was not found)"""
+        expires = time.time() + (self.ttl if data is not None else self.negative_ttl)
+        with self._lock:
+            self._entries[key] = (expires, data)
+            self._entries.move_to_end(key)
+            self._conn.execute('INSERT OR REPLACE INTO entries (key, expires, data) VALUES (?, ?, ?)',
+                               (key, expires, json.dumps(data) if data is not None else None))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def info(self):
+        """Counters plus current size, for /status"""
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), max_entries=self.max_entries)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
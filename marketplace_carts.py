@@ -0,0 +1,227 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+"""
+NEXUS Marketplace Cart Store
+
+Shopping carts keyed by the cart_id cookie. A cart only exists once
+something has been added to it, so visitors who just browse (crawlers,
+health checks, first page loads) never create one. Each cart is persisted
+as its own record, and carts left idle for longer than the TTL are swept
+from memory and storage by a background thread. Reading a cart counts as
+use: the read time is stored on the cart (at most once per
+TOUCH_INTERVAL), so the TTL runs from it after a restart or on another
+worker too.
+
+In cookie mode (NEXUS_CART_MODE=cookie) a small cart is not stored at all:
+its items travel in a signed cookie (CookieCarts), so reading it costs no
+storage I/O and every worker sees the same cart. A cart moves into the
+CartStore once its cookie would pass the size limit.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+# Carts untouched for this many seconds are dropped (the cookie lives as long)
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Largest signed cart cookie; browsers cap a cookie at about 4KB
+DEFAULT_COOKIE_BYTES = 3072
+
+# A cart's stored 'seen' time is brought up to date by a read at most this
+# often (seconds; a tenth of the TTL if that is shorter)
+TOUCH_INTERVAL = 3600
+
+def parse_time(value):
+    """Epoch seconds for an ISO timestamp, or None"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def stored_seen(cart):
+    """Latest read or change time stored on a cart (epoch seconds), or None"""
+    times = [parse_time(cart.get(field)) for field in ('seen', 'updated', 'created')]
+    return max([t for t in times if t is not None], default=None)
+
+class CartStore:
+    """Lazily created, individually persisted carts with idle expiry
+
+    Carts live in the storage engine's 'carts' collection. lock guards the
+    in-memory carts; pass the server's state lock so the sweeper never runs
+    in the middle of a request.
+    """
+
+    def __init__(self, storage, ttl=DEFAULT_TTL, lock=None):
+        self.storage = storage
+        self.ttl = ttl
+        self.touch_interval = min(TOUCH_INTERVAL, ttl / 10)
+        self.stats = {'created': 0, 'expired': 0}
+        self._lock = lock or threading.RLock()
+        self._sweeper = None
+        self.reload()
+
+    def reload(self):
+        """(Re)load every cart from storage"""
+        with self._lock:
+            self._carts = {}
+            # cart_id -> last time it was read or changed (epoch seconds)
+            self._seen = {}
+            for cart_id, cart in self.storage.load('carts').items():
+                self.refresh(cart_id, cart)
+
+    def refresh(self, cart_id, cart):
+        """Take a cart as stored by another process (None = deleted)"""
+        with self._lock:
+            if cart is None:
+                self._carts.pop(cart_id, None)
+                self._seen.pop(cart_id, None)
+                return
+            self._carts[cart_id] = cart
+            self._seen[cart_id] = stored_seen(cart) or datetime.now().timestamp()
+
+    def __len__(self):
+        return len(self._carts)
+
+    def get(self, cart_id):
+        """The cart for a cookie value, or None if there is no live cart"""
+        with self._lock:
+            cart = self._carts.get(cart_id) if cart_id else None
+            if cart is None:
+                return None
+            now = datetime.now().timestamp()
+            if now - self._seen[cart_id] > self.ttl:
+                self._expire([cart_id])
+                if cart_id not in self._carts:
+                    return None
+            self._seen[cart_id] = now
+            if now - (stored_seen(cart) or 0) > self.touch_interval:
+                self._touch(cart_id, now)
+            return self._carts.get(cart_id)
+
+    def _touch(self, cart_id, now):
+        """Store a read of a cart as its 'seen' time"""
+        with self.storage.transaction():
+            # Starting the transaction may have picked up another worker's
+            # change to this cart; stamp that one rather than our copy
+            cart = self._carts.get(cart_id)
+            if cart is not None:
+                cart['seen'] = datetime.fromtimestamp(now).isoformat()
+                self.storage.put('carts', cart, cart_id)
+
+    def save(self, cart_id, cart):
+        """Persist a cart, creating it when cart_id is None; returns its id"""
+        with self._lock:
+            now = datetime.now()
+            if cart_id is None or cart_id not in self._carts:
+                cart_id = str(uuid.uuid4())
+                cart.setdefault('created', now.isoformat())
+                self.stats['created'] += 1
+            cart['updated'] = now.isoformat()
+            self.storage.put('carts', cart, cart_id)
+            self._carts[cart_id] = cart
+            self._seen[cart_id] = now.timestamp()
+            return cart_id
+
+    def delete(self, cart_id):
+        """Drop a cart (no-op if missing)"""
+        with self._lock:
+            if self._carts.pop(cart_id, None) is not None:
+                del self._seen[cart_id]
+                self.storage.delete('carts', cart_id)
+
+    def sweep(self):
+        """Remove carts idle for longer than the TTL; returns how many"""
+        with self._lock:
+            cutoff = datetime.now().timestamp() - self.ttl
+            expired = [cart_id for cart_id, seen in self._seen.items() if seen < cutoff]
+            return self._expire(expired) if expired else 0
+
+    def _expire(self, cart_ids):
+        """Delete the carts that are still idle past the TTL; returns how many"""
+        count = 0
+        with self.storage.transaction():
+            # Starting the transaction may have picked up another worker's
+            # read of a cart, or its deletion; those carts are left alone
+            cutoff = datetime.now().timestamp() - self.ttl
+            for cart_id in cart_ids:
+                seen = self._seen.get(cart_id)
+                if seen is None or seen >= cutoff:
+                    continue
+                self._carts.pop(cart_id, None)
+                self._seen.pop(cart_id, None)
+                self.storage.delete('carts', cart_id)
+                count += 1
+        self.stats['expired'] += count
+        return count
+
+    def start_sweeper(self, interval=3600):
+        """Sweep expired carts every interval seconds on a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Cart sweep failed: {e}")
+                time.sleep(interval)
+
+        self._sweeper = threading.Thread(target=run, daemon=True, name='cart-sweeper')
+        self._sweeper.start()
+
+    def info(self):
+        """Counters plus current size, for /status"""
+        with self._lock:
+            return dict(self.stats, carts=len(self._carts), ttl=self.ttl)
+
+class CookieCarts:
+    """Carts encoded into a signed cookie instead of server storage
+
+    The cookie holds [[listing_id, quantity], ...], zlib-compressed when that
+    is smaller, signed with the app's secret key and timestamped so it
+    expires with the TTL. A tampered, expired or malformed cookie reads as
+    no cart.
+    """
+
+    def __init__(self, secret_key, max_bytes=DEFAULT_COOKIE_BYTES, ttl=DEFAULT_TTL):
+        self.serializer = URLSafeTimedSerializer(secret_key, salt='nexus-cart')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def load(self, value):
+        """Cart for a cookie value, or None"""
+        if not value:
+            return None
+        try:
+            entries = self.serializer.loads(value, max_age=self.ttl)
+            items = [{'listing_id': str(listing_id), 'quantity': int(quantity)} for listing_id, quantity in entries]
+        except (BadData, TypeError, ValueError):
+            return None
+        return {'items': items}
+
+    def dump(self, cart):
+        """Cookie value for a cart, or None if it would be larger than max_bytes"""
+        value = self.serializer.dumps([[i['listing_id'], i['quantity']] for i in cart.get('items', [])])
+        if len(value) > self.max_bytes:
+            return None
+        return value
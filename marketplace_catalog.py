@@ -0,0 +1,239 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Card Catalog
+
+Local copy of the Scryfall card data the marketplace uses for enrichment,
+imported from a Scryfall bulk-data file (default-cards, oracle-cards, ...;
+https://scryfall.com/docs/api/bulk-data). The file is streamed, so imports
+never hold the whole dump in memory, and the catalog is a small SQLite
+table keyed by normalized card name and (name, set) holding only the
+fields copied onto listings.
+
+Lookups are local, so listings whose card is in the catalog are enriched
+without any network call.
+
+Usage:
+    python marketplace_catalog.py import <bulk-data.json[.gz]> [db_path]
+"""
+
+import gzip
+import json
+import re
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+from marketplace_search import normalize
+
+# Layouts that are not playable cards and only shadow real names
+SKIPPED_LAYOUTS = {'art_series'}
+
+WHITESPACE_RE = re.compile(r'\s*')
+
+def catalog_name(card_name):
+    """Catalog key for a card name (casefolded, accents and extra spaces removed)"""
+    return ' '.join(normalize(card_name).split())
+
+def card_names(card):
+    """Catalog keys a Scryfall card answers to (full name and each face name)"""
+    names = {catalog_name(card.get('name') or '')}
+    names.update(catalog_name(face['name']) for face in card.get('card_faces') or [] if face.get('name'))
+    names.discard('')
+    return names
+
+def card_data(card):
+    """Listing enrichment fields from a Scryfall card object"""
+    faces = card.get('card_faces') or [{}]
+    images = card.get('image_uris') or faces[0].get('image_uris') or {}
+    return {
+        'image_url': images.get('normal', ''),
+        'image_small': images.get('small', ''),
+        'scryfall_price': float((card.get('prices') or {}).get('usd', 0) or 0),
+        'type_line': card.get('type_line', ''),
+        'mana_cost': card.get('mana_cost', faces[0].get('mana_cost', '')),
+        'oracle_text': card.get('oracle_text', faces[0].get('oracle_text', '')),
+        'rarity': card.get('rarity', 'common'),
+        'set_name': card.get('set_name', ''),
+        'colors': card.get('colors', faces[0].get('colors', [])),
+    }
+
+# ============================================
+# STREAMING READER
+# ============================================
+
+def iter_json_array(f, chunk_size=1 << 20):
+    """Yield the items of a top-level JSON array from a text file object
+    without loading the whole document"""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        pos = WHITESPACE_RE.match(buf, pos).end()
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            if buf[pos] == ',':
+                pos += 1
+                continue
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A number cut off at the buffer edge still decodes, so only trust
+            # an item once the separator after it has been read
+            if end is not None:
+                end = WHITESPACE_RE.match(buf, end).end()
+                if end < len(buf) and buf[end] in ',]':
+                    yield item
+                    pos = end
+                    continue
+                if eof:
+                    raise ValueError('Expected , or ] after array item')
+        elif eof:
+            raise ValueError('Unexpected end of JSON array')
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+def open_bulk_file(path):
+    """Open a bulk-data file for reading (gzip-compressed if it ends in .gz)"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+# ============================================
+# CATALOG
+# ============================================
+
+class CardCatalog:
+    """SQLite-backed card catalog
+
+    Each card is stored under its full name and each face name, once for
+    its set and once set-less. The set-less row keeps the preferred printing
+    (paper, non-promo, most recently released), mirroring what Scryfall's
+    /cards/named returns without a set.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cards (name TEXT NOT NULL, set_code TEXT NOT NULL, '
+            'rank TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (name, set_code)) WITHOUT ROWID'
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cards WHERE set_code = ''").fetchone()[0]
+
+    def lookup(self, card_name, set_code=None):
+        """Card data for a name (and set, falling back to any printing), or None"""
+        name = catalog_name(card_name or '')
+        if not name:
+            return None
+        with self._lock:
+            row = None
+            if set_code:
+                row = self._conn.execute('SELECT data FROM cards WHERE name = ? AND set_code = ?',
+                                         (name, str(set_code).lower())).fetchone()
+            if row is None:
+                row = self._conn.execute("SELECT data FROM cards WHERE name = ? AND set_code = ''",
+                                         (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def import_bulk(self, path, batch_size=2000):
+        """Replace the catalog with the cards in a Scryfall bulk-data file;
+        returns (cards read, cards imported)"""
+        read = imported = 0
+        batch = []
+        with self._lock, open_bulk_file(path) as f:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM cards')
+                for card in iter_json_array(f):
+                    read += 1
+                    rows = self._rows(card)
+                    if rows:
+                        imported += 1
+                        batch.extend(rows)
+                    if len(batch) >= batch_size:
+                        self._insert(batch)
+                        batch = []
+                self._insert(batch)
+            except:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+        return read, imported
+
+    def _rows(self, card):
+        if card.get('object', 'card') != 'card' or not card.get('name') or card.get('layout') in SKIPPED_LAYOUTS:
+            return []
+        names = card_names(card)
+        paper = 'paper' in card.get('games', ['paper'])
+        rank = f"{paper:d}{not card.get('promo', False):d}{card.get('released_at', '')}"
+        data = json.dumps(card_data(card), separators=(',', ':'))
+        set_code = str(card.get('set') or '').lower()
+        return [(name, code, rank, data) for name in names for code in {set_code, ''}]
+
+    def _insert(self, rows):
+        self._conn.executemany(
+            'INSERT INTO cards (name, set_code, rank, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(name, set_code) DO UPDATE SET rank = excluded.rank, data = excluded.data '
+            'WHERE excluded.rank > cards.rank',
+            rows
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def open_catalog(db_path):
+    """Catalog at db_path, or None if nothing has been imported there"""
+    if not Path(db_path).exists():
+        return None
+    return CardCatalog(db_path)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'import':
+        print(__doc__)
+        sys.exit(1)
+    src = Path(sys.argv[2])
+    dst = Path(sys.argv[3]) if len(sys.argv) > 3 else Path(__file__).parent / 'data' / 'scryfall_catalog.db'
+    catalog = CardCatalog(dst)
+    read, imported = catalog.import_bulk(src)
+    print(f'{read} cards read, {imported} imported, {len(catalog)} distinct names')
+    print(f'Catalog written to {dst}')
+    catalog.close()
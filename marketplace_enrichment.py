@@ -0,0 +1,152 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Enrichment Queue
+
+Background Scryfall enrichment. Request handlers only enqueue listings that
+are missing card data and respond with whatever the listing already has;
+a small pool of worker threads fetches each distinct card once and hands
+the result back so every listing waiting on it is patched in place.
+
+With a batch fetcher, workers drain up to batch_size queued cards at a time
+(e.g. one Scryfall /cards/collection request for a whole sync).
+"""
+
+import queue
+import threading
+import time
+
+def enrichment_key(card_name, set_code=None):
+    """Same key the Scryfall cache uses"""
+    return f"{card_name}|{set_code or 'any'}".lower()
+
+class EnrichmentQueue:
+    """Deduplicated work queue feeding a pool of enrichment threads
+
+    fetch(card_name, set_code) returns card data or None.
+    fetch_many([(card_name, set_code), ...]), if given, returns
+    {enrichment key: card data or None} and is used whenever more than one
+    card is waiting.
+    on_result(data, listing_ids) is called from a worker thread once a
+    card has been fetched, with the ids of every listing waiting on it.
+    """
+
+    def __init__(self, fetch, on_result, workers=2, fetch_many=None, batch_size=75, batch_wait=0.05):
+        self._fetch = fetch
+        self._fetch_many = fetch_many
+        self._batch_size = batch_size if fetch_many else 1
+        self._batch_wait = batch_wait
+        self._on_result = on_result
+        self._workers = workers
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        self.stats = {'enqueued': 0, 'deduplicated': 0, 'batches': 0, 'fetched': 0, 'not_found': 0, 'failed': 0}
+
+    def enqueue(self, listing):
+        """Queue a listing for enrichment; returns False if it needs none"""
+        card_name = listing.get('card_name')
+        if not card_name or listing.get('image_url') or not listing.get('id'):
+            return False
+        key = enrichment_key(card_name, listing.get('set_code'))
+        with self._lock:
+            if key in self._pending:
+                self._pending[key]['ids'].add(listing['id'])
+                self.stats['deduplicated'] += 1
+                return True
+            self._pending[key] = {'card_name': card_name, 'set_code': listing.get('set_code'),
+                                  'ids': {listing['id']}}
+            self.stats['enqueued'] += 1
+            self._start()
+        self._queue.put(key)
+        return True
+
+    def pending(self):
+        """Number of distinct cards waiting to be fetched"""
+        with self._lock:
+            return len(self._pending)
+
+    def join(self, timeout=None):
+        """Wait until every queued card has been fetched and applied
+        (or timeout seconds pass)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._pending and not self._busy:
+                    break
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _start(self):
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._run, daemon=True,
+                                      name=f'enrichment-{len(self._threads) + 1}')
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_batch(self):
+        """Block for one queued key, then take whatever else is queued (up
+        to batch_size), giving a sync a moment to finish enqueueing"""
+        keys = [self._queue.get()]
+        deadline = time.time() + self._batch_wait
+        while len(keys) < self._batch_size:
+            try:
+                keys.append(self._queue.get(timeout=max(0, deadline - time.time())))
+            except queue.Empty:
+                break
+        with self._lock:
+            jobs = {key: self._pending[key] for key in keys if key in self._pending}
+            if jobs:
+                self._busy += 1
+        return jobs
+
+    def _fetch_jobs(self, jobs):
+        """key -> card data (None if not found) for a batch of jobs"""
+        if len(jobs) > 1:
+            self.stats['batches'] += 1
+            results = self._fetch_many([(job['card_name'], job['set_code']) for job in jobs.values()])
+            return {key: results.get(key) for key in jobs}
+        return {key: self._fetch(job['card_name'], job['set_code']) for key, job in jobs.items()}
+
+    def _run(self):
+        while True:
+            jobs = self._next_batch()
+            if not jobs:
+                continue
+            results = {}
+            try:
+                results = self._fetch_jobs(jobs)
+                for data in results.values():
+                    self.stats['fetched' if data else 'not_found'] += 1
+            except Exception as e:
+                print(f"Enrichment error for {', '.join(job['card_name'] for job in jobs.values())}: {e}")
+                self.stats['failed'] += len(jobs)
+            for key, job in jobs.items():
+                with self._lock:
+                    # Listings that joined while the fetch was running are included
+                    ids = self._pending.pop(key)['ids']
+                try:
+                    if results.get(key):
+                        self._on_result(results[key], ids)
+                except Exception as e:
+                    print(f"Enrichment update error for {job['card_name']}: {e}")
+            with self._lock:
+                self._busy -= 1
@@ -0,0 +1,242 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Image Cache
+
+Local copies of card images for /img/<listing_id>/<size>. Image files are
+content-addressed (data/images/<sha256[:2]>/<sha256>.<ext>), so a card
+image shared by many listings is stored once and its digest doubles as a
+strong ETag. A small SQLite table maps (source url, size) to a digest.
+
+Downloads and thumbnails happen on a background thread; until an image is
+cached the endpoint redirects to the upstream URL. Thumbnails are resized
+with Pillow when it is installed, otherwise the Scryfall 'small' image is
+stored as the thumbnail.
+
+Image URLs are set by sellers, so only URLs on the configured sources
+(Scryfall's image host by default) are downloaded, redirects are not
+followed and bodies are read up to max_bytes.
+"""
+
+import hashlib
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Size name -> max width in pixels (None = the source image as is)
+SIZES = {
+    'thumb': 244,
+    'normal': None,
+}
+
+CONTENT_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp', 'gif': 'image/gif'}
+
+# Seconds before an image that failed to download is tried again
+RETRY_AFTER = 600
+
+# Origins images may be downloaded from
+DEFAULT_SOURCES = ('https://cards.scryfall.io',)
+
+# Largest image body accepted from a source
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+def url_origin(url):
+    """(scheme, host, port) of a plain http(s) URL, or None"""
+    try:
+        parts = urlsplit(url or '')
+        port = parts.port or {'http': 80, 'https': 443}.get(parts.scheme)
+    except ValueError:
+        return None
+    if parts.scheme not in ('http', 'https') or not parts.hostname or '@' in parts.netloc or '\\' in url:
+        return None
+    return parts.scheme, parts.hostname, port
+
+def image_extension(data):
+    """File extension for image bytes, from their magic number"""
+    if data[:3] == b'\xff\xd8\xff':
+        return 'jpg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    return None
+
+def make_thumbnail(data, width):
+    """JPEG bytes of the image scaled down to width (requires Pillow)"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=85, optimize=True)
+        return out.getvalue()
+
+class ImageCache:
+    """Content-addressed image store with a background download/thumbnail worker"""
+
+    def __init__(self, root, timeout=10, sources=DEFAULT_SOURCES, max_bytes=MAX_IMAGE_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.sources = {url_origin(source) for source in sources} - {None}
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'NEXUS-Marketplace/3.0'})
+        self.stats = {'hits': 0, 'misses': 0, 'downloads': 0, 'thumbnails': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / 'images.db'), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS refs (url TEXT NOT NULL, size TEXT NOT NULL, digest TEXT NOT NULL, '
+            'ext TEXT NOT NULL, PRIMARY KEY (url, size)) WITHOUT ROWID'
+        )
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._failed = {}
+        self._thread = None
+
+    def path(self, digest, ext):
+        return self.root / digest[:2] / f'{digest}.{ext}'
+
+    def get(self, url, size):
+        """(path, digest, content type) of a cached image, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT digest, ext FROM refs WHERE url = ? AND size = ?',
+                                     (url, size)).fetchone()
+        if row is not None:
+            path = self.path(*row)
+            if path.exists():
+                self.stats['hits'] += 1
+                return path, row[0], CONTENT_TYPES[row[1]]
+        self.stats['misses'] += 1
+        return None
+
+    def allowed(self, url):
+        """True if url is on one of the image sources"""
+        return url_origin(url) in self.sources
+
+    def request(self, url, small_url=None):
+        """Queue a background download of url (and its thumbnails)
+
+        URLs outside the image sources are ignored.
+        """
+        if not self.allowed(url):
+            return
+        if not self.allowed(small_url):
+            small_url = None
+        with self._lock:
+            if url in self._queued or time.time() - self._failed.get(url, 0) < RETRY_AFTER:
+                return
+            self._queued.add(url)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='image-cache')
+                self._thread.start()
+        self._queue.put((url, small_url))
+
+    def store(self, data):
+        """Write image bytes under their digest; returns (digest, ext)"""
+        ext = image_extension(data)
+        if ext is None:
+            raise ValueError('Not an image')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, ext)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        return digest, ext
+
+    def _ref(self, url, size, digest, ext):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO refs (url, size, digest, ext) VALUES (?, ?, ?, ?)',
+                               (url, size, digest, ext))
+
+    def _download(self, url):
+        if not self.allowed(url):
+            raise ValueError('Not an image source')
+        with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False) as response:
+            response.raise_for_status()
+            if response.status_code != 200:
+                raise ValueError(f'Unexpected status {response.status_code}')
+            if int(response.headers.get('Content-Length') or 0) > self.max_bytes:
+                raise ValueError('Image too large')
+            data = bytearray()
+            for chunk in response.iter_content(65536):
+                data += chunk
+                if len(data) > self.max_bytes:
+                    raise ValueError('Image too large')
+        self.stats['downloads'] += 1
+        return bytes(data)
+
+    def _cache(self, url, small_url):
+        data = self._download(url)
+        digest, ext = self.store(data)
+        for size, width in SIZES.items():
+            if width is None:
+                self._ref(url, size, digest, ext)
+            elif Image is not None:
+                self._ref(url, size, *self.store(make_thumbnail(data, width)))
+                self.stats['thumbnails'] += 1
+            elif small_url:
+                self._ref(url, size, *self.store(self._download(small_url)))
+            else:
+                self._ref(url, size, digest, ext)
+
+    def _run(self):
+        while True:
+            url, small_url = self._queue.get()
+            try:
+                self._cache(url, small_url)
+            except Exception as e:
+                print(f"Image cache error for {url}: {e}")
+                self.stats['errors'] += 1
+                with self._lock:
+                    self._failed[url] = time.time()
+            finally:
+                with self._lock:
+                    self._queued.discard(url)
+
+    def join(self, timeout=None):
+        """Wait for queued downloads to finish (or timeout seconds pass)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._queued:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.01)
+
+    def info(self):
+        """Counters for /status"""
+        return dict(self.stats, pillow=Image is not None)
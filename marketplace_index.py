@@ -0,0 +1,424 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Indexes
+
+In-memory indexes over the listings, orders and sellers collections. The
+loader builds them once at startup and every code path that adds, changes
+or removes a record calls reindex()/remove() so lookups never scan.
+"""
+
+import hashlib
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from marketplace_search import SearchIndex
+
+# ============================================
+# RECORD INDEXES
+# ============================================
+
+class RecordIndex:
+    """id -> record index over a list collection, plus value -> records
+    indexes for each name in `fields`
+
+    The indexed values of every record are remembered, so reindex() can
+    move a record between buckets after it was changed in place.
+    """
+
+    fields = ()
+
+    def __init__(self, records=()):
+        self.rebuild(records)
+
+    def rebuild(self, records):
+        """Rebuild the index from scratch"""
+        self.by_id = {}
+        self.by_field = {field: {} for field in self.fields}
+        self._keys = {}
+        for record in records:
+            self.reindex(record)
+
+    def get(self, record_id):
+        """Record with this id, or None"""
+        if record_id is None:
+            return None
+        return self.by_id.get(record_id)
+
+    def lookup(self, field, value):
+        """id -> record mapping of records whose field equals value"""
+        return self.by_field[field].get(value, {})
+
+    def index_keys(self, record):
+        """Values this index files the record under"""
+        return tuple(record.get(field) for field in self.fields)
+
+    def reindex(self, record):
+        """Add a record, or refresh it after it changed"""
+        record_id = record['id']
+        keys = self.index_keys(record)
+        if record_id in self.by_id:
+            if self.by_id[record_id] is record and self._keys[record_id] == keys:
+                return
+            self._unindex(record_id, self._keys[record_id])
+        self.by_id[record_id] = record
+        self._keys[record_id] = keys
+        self._index(record_id, record, keys)
+
+    def remove(self, record_id):
+        """Drop a record from the index (no-op if missing)"""
+        record = self.by_id.pop(record_id, None)
+        if record is not None:
+            self._unindex(record_id, self._keys.pop(record_id))
+        return record
+
+    def _index(self, record_id, record, keys):
+        for field, value in zip(self.fields, keys):
+            self.by_field[field].setdefault(value, {})[record_id] = record
+
+    def _unindex(self, record_id, keys):
+        for field, value in zip(self.fields, keys):
+            bucket = self.by_field[field].get(value)
+            if bucket is not None:
+                bucket.pop(record_id, None)
+                if not bucket:
+                    del self.by_field[field][value]
+
+    def __contains__(self, record_id):
+        return record_id in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+class SellerRecordIndex(RecordIndex):
+    """Index for records owned by a seller, with per-seller status counters"""
+
+    fields = ('seller_id', 'status')
+
+    def rebuild(self, records):
+        self.status_counts = {}
+        super().rebuild(records)
+
+    def for_seller(self, seller_id):
+        """All records belonging to a seller"""
+        return list(self.lookup('seller_id', seller_id).values())
+
+    def with_status(self, status):
+        """All records with this status"""
+        return list(self.lookup('status', status).values())
+
+    def count(self, seller_id, status=None):
+        """Number of a seller's records, optionally only those with a status"""
+        if status is None:
+            return len(self.lookup('seller_id', seller_id))
+        return self.status_counts.get(seller_id, {}).get(status, 0)
+
+    def _index(self, record_id, record, keys):
+        super()._index(record_id, record, keys)
+        seller_id, status = keys[:2]
+        counts = self.status_counts.setdefault(seller_id, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def _unindex(self, record_id, keys):
+        super()._unindex(record_id, keys)
+        seller_id, status = keys[:2]
+        counts = self.status_counts[seller_id]
+        counts[status] -= 1
+        if not counts[status]:
+            del counts[status]
+            if not counts:
+                del self.status_counts[seller_id]
+
+def listing_price(record):
+    """Listing price as a float (missing or malformed prices count as 0)"""
+    try:
+        price = float(record.get('price', 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return price if price == price else 0.0
+
+# Highest possible id, for inclusive upper bounds on (key, id) pairs
+MAX_ID = chr(0x10FFFF)
+
+class SortedIndex:
+    """Sorted (key, listing id) pairs for range queries and ordered walks"""
+
+    def __init__(self):
+        self.entries = []
+        self._deferred = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def defer(self):
+        """Append without sorting until finish() (bulk loads)"""
+        self._deferred = True
+
+    def finish(self):
+        self.entries.sort()
+        self._deferred = False
+
+    def add(self, key, record_id):
+        if self._deferred:
+            self.entries.append((key, record_id))
+        else:
+            insort(self.entries, (key, record_id))
+
+    def remove(self, key, record_id):
+        if self._deferred:
+            self.entries.remove((key, record_id))
+            return
+        i = bisect_left(self.entries, (key, record_id))
+        if i < len(self.entries) and self.entries[i] == (key, record_id):
+            del self.entries[i]
+
+    def bounds(self, lo=None, hi=None):
+        """Slice of entries with lo <= key <= hi"""
+        start = 0 if lo is None else bisect_left(self.entries, (lo,))
+        stop = len(self.entries) if hi is None else bisect_right(self.entries, (hi, MAX_ID))
+        return start, max(start, stop)
+
+    def count(self, lo=None, hi=None):
+        start, stop = self.bounds(lo, hi)
+        return stop - start
+
+    def ids(self, lo=None, hi=None, reverse=False):
+        """Listing ids with lo <= key <= hi, in key order (descending if reverse)"""
+        start, stop = self.bounds(lo, hi)
+        entries = self.entries
+        step = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        return [entries[i][1] for i in step]
+
+ListingKeys = namedtuple('ListingKeys', 'seller_id status card_name price value type_line oracle_text '
+                                        'listed set_code rarity colors condition')
+
+def listed_key(record):
+    """Position of a listing in listing order: its stored 'listed_at' time
+    ('' for listings that have none, which sort first)"""
+    return str(record.get('listed_at') or '')
+
+def migrate_listed_at(records):
+    """Give listings stored before 'listed_at' existed their last sync time
+    (or ''); returns the changed listings"""
+    migrated = []
+    for record in records:
+        if 'listed_at' not in record:
+            record['listed_at'] = record.get('synced_at') or ''
+            migrated.append(record)
+    return migrated
+
+# Value indexes over active listings (set/rarity lowercased), used by the
+# query planner and as facet counters
+ACTIVE_FIELDS = ('seller_id', 'set_code', 'rarity')
+
+# Color bucket for enriched cards with no colors
+COLORLESS = 'C'
+
+def listing_colors(record):
+    """Color letters of an enriched listing (COLORLESS if it has none)"""
+    colors = record.get('colors')
+    if colors is None:
+        return ()
+    if isinstance(colors, str):
+        colors = [colors]
+    return tuple(sorted({str(c).upper() for c in colors})) or (COLORLESS,)
+
+class ListingIndex(SellerRecordIndex):
+    """Indexes over listings, plus running totals, full-text search and
+    sorted/value indexes for active listings
+
+    `order` keeps active listings in listing order, by (listed_key, id),
+    and `prices` by (price, id); both keys come from the stored listing, so
+    every process and every rebuild orders listings the same way.
+    `by_card` maps (seller_id, card_name, condition) to listing ids, in any
+    status, for deduplicating synced listings.
+
+    Attached views (see marketplace_views) are told about every reindex
+    and removal, including changes to fields this index does not cover.
+    """
+
+    def __init__(self, records=()):
+        self.views = []
+        super().__init__(records)
+
+    def attach(self, view):
+        """Keep a view in step with the listings from now on"""
+        self.views.append(view)
+        view.rebuild(self.by_id.values())
+
+    def rebuild(self, records):
+        self.active_value = 0.0
+        self.active_names = {}
+        self.active_by = {field: {} for field in ACTIVE_FIELDS + ('color',)}
+        self.search = SearchIndex()
+        self.prices = SortedIndex()
+        self.order = SortedIndex()
+        self.by_card = {}
+        self.prices.defer()
+        self.order.defer()
+        # Views are rebuilt once at the end rather than per listing
+        views, self.views = self.views, []
+        super().rebuild(records)
+        self.prices.finish()
+        self.order.finish()
+        self.views = views
+        for view in self.views:
+            view.rebuild(self.by_id.values())
+
+    def active(self):
+        """id -> listing mapping of active listings"""
+        return self.lookup('status', 'Active')
+
+    def find_card(self, seller_id, card_name, condition):
+        """First listing of a seller with this card name and condition, or None"""
+        ids = self.by_card.get((seller_id, card_name, condition))
+        return self.by_id[next(iter(ids))] if ids else None
+
+    def keys(self, record_id):
+        """Indexed values (ListingKeys) of a listing"""
+        return self._keys[record_id]
+
+    def reindex(self, record):
+        super().reindex(record)
+        for view in self.views:
+            view.update(record)
+
+    def remove(self, record_id):
+        record = super().remove(record_id)
+        if record is not None:
+            for view in self.views:
+                view.remove(record_id)
+        return record
+
+    def index_keys(self, record):
+        price = listing_price(record)
+        try:
+            value = price * (record.get('quantity', 1) or 0)
+        except TypeError:
+            value = 0.0
+        return ListingKeys(record.get('seller_id'), record.get('status'), record.get('card_name'), price, value,
+                           record.get('type_line', ''), record.get('oracle_text', ''), listed_key(record),
+                           str(record.get('set_code') or '').lower(), str(record.get('rarity') or '').lower(),
+                           listing_colors(record), record.get('condition'))
+
+    def _index(self, record_id, record, keys):
+        super()._index(record_id, record, keys)
+        self.by_card.setdefault((keys.seller_id, keys.card_name, keys.condition), {})[record_id] = None
+        if keys.status == 'Active':
+            self.active_value += keys.value
+            self.active_names[keys.card_name] = self.active_names.get(keys.card_name, 0) + 1
+            self.search.add(record_id, keys.card_name, keys.type_line, keys.oracle_text)
+            self.prices.add(keys.price, record_id)
+            self.order.add(keys.listed, record_id)
+            for field in ACTIVE_FIELDS:
+                self.active_by[field].setdefault(getattr(keys, field), {})[record_id] = None
+            for color in keys.colors:
+                self.active_by['color'].setdefault(color, {})[record_id] = None
+
+    def _unindex(self, record_id, keys):
+        super()._unindex(record_id, keys)
+        card = (keys.seller_id, keys.card_name, keys.condition)
+        del self.by_card[card][record_id]
+        if not self.by_card[card]:
+            del self.by_card[card]
+        if keys.status == 'Active':
+            for field, values in [(f, (getattr(keys, f),)) for f in ACTIVE_FIELDS] + [('color', keys.colors)]:
+                for value in values:
+                    bucket = self.active_by[field][value]
+                    del bucket[record_id]
+                    if not bucket:
+                        del self.active_by[field][value]
+            self.order.remove(keys.listed, record_id)
+            self.prices.remove(keys.price, record_id)
+            self.search.remove(record_id)
+            self.active_value -= keys.value
+            self.active_names[keys.card_name] -= 1
+            if not self.active_names[keys.card_name]:
+                del self.active_names[keys.card_name]
+
+class OrderIndex(SellerRecordIndex):
+    """Indexes over orders"""
+
+    fields = ('seller_id', 'status', 'idempotency_key')
+
+    def for_idempotency_key(self, key):
+        """Orders created by the checkout that sent this Idempotency-Key"""
+        if not key:
+            return []
+        return list(self.lookup('idempotency_key', key).values())
+
+# ============================================
+# API KEY INDEX
+# ============================================
+
+def hash_api_key(api_key):
+    """Digest stored in place of a raw seller API key"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+def migrate_api_keys(sellers):
+    """Swap raw 'api_key' fields for 'api_key_hash'; returns the changed seller ids"""
+    migrated = []
+    for seller_id, seller in sellers.items():
+        api_key = seller.pop('api_key', None)
+        if api_key is None:
+            continue
+        if not seller.get('api_key_hash'):
+            seller['api_key_hash'] = hash_api_key(api_key)
+        migrated.append(seller_id)
+    return migrated
+
+class ApiKeyIndex:
+    """sha256(api_key) -> seller_id index for seller authentication
+
+    Only digests are kept in memory. Sellers registered before keys were
+    hashed carry a raw 'api_key' until migrate_api_keys() replaces it; such
+    a key is hashed when indexed.
+    """
+
+    def __init__(self, sellers=None):
+        self.rebuild(sellers or {})
+
+    def rebuild(self, sellers):
+        """Rebuild the index from the sellers dict"""
+        self.by_digest = {}
+        self.by_seller = {}
+        for seller_id, seller in sellers.items():
+            self.reindex(seller_id, seller)
+
+    def reindex(self, seller_id, seller):
+        """Index a seller's current key, dropping any previous one"""
+        self.remove(seller_id)
+        digest = seller.get('api_key_hash')
+        if not digest and seller.get('api_key'):
+            digest = hash_api_key(seller['api_key'])
+        if digest:
+            self.by_digest[digest] = seller_id
+            self.by_seller[seller_id] = digest
+
+    def remove(self, seller_id):
+        digest = self.by_seller.pop(seller_id, None)
+        if digest and self.by_digest.get(digest) == seller_id:
+            del self.by_digest[digest]
+
+    def lookup(self, api_key):
+        """Seller id for an API key, or None"""
+        if not api_key:
+            return None
+        # No constant-time compare needed: the lookup is keyed by sha256 of
+        # the presented key, so its timing depends only on that digest, and
+        # learning digest prefixes gives no way to build a key that matches
+        return self.by_digest.get(hash_api_key(api_key))
@@ -0,0 +1,229 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Background Jobs
+
+Runs long seller syncs off the request thread. A job is queued per seller
+and returns an id right away; jobs for the same seller run one after
+another in submission order, different sellers run in parallel on a small
+thread pool. Finished jobs are kept for an hour so clients can poll them.
+
+With a db_path, job snapshots are also written to a small SQLite table
+whenever a job starts, checkpoints or finishes, so a poll that lands on
+another worker process still finds the job. The same database serializes
+jobs per owner across processes: a job only starts once it holds its
+owner's row in the claims table, and waits (still 'queued') while a job
+of another process holds it. A claim whose process has died, or that has
+not checkpointed for CLAIM_STALE seconds, is taken over.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Seconds between attempts to claim an owner held by another process
+CLAIM_POLL = 0.5
+
+# A claim not refreshed by a checkpoint for this long is abandoned
+CLAIM_STALE = 600
+
+def pid_alive(pid):
+    """False if no process has this pid (always True where that can't be checked)"""
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class Job:
+    """A queued or running job; fn(job) updates job.counts as it goes"""
+
+    def __init__(self, owner, kind, fn, store=None):
+        self.id = f"JOB-{uuid.uuid4().hex[:12].upper()}"
+        self.owner = owner
+        self.kind = kind
+        self.fn = fn
+        self.status = 'queued'
+        self.counts = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._store = store
+
+    def checkpoint(self):
+        """Publish the job's current counts to other processes"""
+        if self._store is not None:
+            self._store(self)
+
+    def to_dict(self):
+        elapsed = None
+        if self.started is not None:
+            elapsed = (self.finished or time.time()) - self.started
+        processed = self.counts.get('processed', 0)
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'counts': dict(self.counts),
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'elapsed_s': round(elapsed, 3) if elapsed is not None else None,
+            'per_second': round(processed / elapsed, 1) if elapsed else None,
+        }
+
+class JobRunner:
+    """Thread pool running jobs FIFO per owner (e.g. per seller)"""
+
+    def __init__(self, workers=2, keep_seconds=3600, db_path=None):
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._queues = {}    # owner -> deque of jobs, head is running
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex
+        self._conn = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA busy_timeout=5000')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, owner TEXT NOT NULL, '
+                'data TEXT NOT NULL, updated REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS claims (owner TEXT PRIMARY KEY, job_id TEXT NOT NULL, '
+                'runner TEXT NOT NULL, pid INTEGER NOT NULL, heartbeat REAL NOT NULL)'
+            )
+
+    def submit(self, owner, kind, fn):
+        """Queue fn(job) for an owner; returns the Job"""
+        job = Job(owner, kind, fn, store=self._save if self._conn is not None else None)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            queue = self._queues.setdefault(owner, deque())
+            queue.append(job)
+            if len(queue) == 1:
+                self._executor.submit(self._run, owner)
+        job.checkpoint()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """(owner, job dict) for a job of this or another process, or None"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.owner, job.to_dict()
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT owner, data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _save(self, job):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO jobs (id, owner, data, updated) VALUES (?, ?, ?, ?)',
+                               (job.id, job.owner, json.dumps(job.to_dict(), default=str), now))
+            self._conn.execute('UPDATE claims SET heartbeat = ? WHERE owner = ? AND job_id = ?',
+                               (now, job.owner, job.id))
+
+    def _claim(self, job):
+        """Wait until no other runner has a job of job.owner running, then
+        claim the owner for job"""
+        while True:
+            with self._lock:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    row = self._conn.execute('SELECT runner, pid, heartbeat FROM claims WHERE owner = ?',
+                                             (job.owner,)).fetchone()
+                    # Our own runner's claims are always left over: it runs
+                    # one job per owner at a time
+                    free = (row is None or row[0] == self._token or not pid_alive(row[1])
+                            or time.time() - row[2] > CLAIM_STALE)
+                    if free:
+                        self._conn.execute('INSERT OR REPLACE INTO claims (owner, job_id, runner, pid, heartbeat) '
+                                           'VALUES (?, ?, ?, ?, ?)',
+                                           (job.owner, job.id, self._token, os.getpid(), time.time()))
+                finally:
+                    self._conn.execute('COMMIT')
+            if free:
+                return
+            time.sleep(CLAIM_POLL)
+
+    def _release(self, job):
+        with self._lock:
+            self._conn.execute('DELETE FROM claims WHERE owner = ? AND job_id = ?', (job.owner, job.id))
+
+    def _run(self, owner):
+        with self._lock:
+            job = self._queues[owner][0]
+        try:
+            if self._conn is not None:
+                self._claim(job)
+            job.status = 'running'
+            job.started = time.time()
+            job.checkpoint()
+            job.result = job.fn(job)
+            job.status = 'completed'
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished = time.time()
+        job.checkpoint()
+        if self._conn is not None:
+            self._release(job)
+        with self._lock:
+            queue = self._queues[owner]
+            queue.popleft()
+            if queue:
+                self._executor.submit(self._run, owner)
+            else:
+                del self._queues[owner]
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+        if self._conn is not None:
+            self._conn.execute('DELETE FROM jobs WHERE updated < ?', (cutoff,))
+
+    def info(self):
+        """Job counts by status, for /status"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
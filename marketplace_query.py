@@ -0,0 +1,451 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Query Planner
+
+Answers /api/listings filters from the ListingIndex. Each filter knows how
+many active listings it matches (cheaply, from its index); the most
+selective one produces the starting candidate ids and every other filter
+either intersects with its own id set or, when that set is larger than
+the candidates left, is checked per candidate. Only ids move through the
+plan; the server materializes listing dicts for the final page only.
+
+Pagination is either offset/limit or keyset: every sort order has a stable
+key per listing (sequence number, price + id, or relevance rank), and an
+opaque cursor carries the key of the last listing served. The next page
+starts strictly after that key, so it is unaffected by listings added or
+removed in the meantime. Unfiltered and price-only queries slice their
+sorted index directly at the cursor; others seek into the planned ids by
+binary search.
+
+Every key ends in the listing id and is derived from stored listing
+fields ('listed_at' for listing order), so a cursor means the same thing
+on every gunicorn worker and after a restart or index rebuild.
+
+explain=1 on /api/listings returns the plan that was used.
+"""
+
+import base64
+import json
+import time
+from bisect import bisect_left, bisect_right
+
+from marketplace_index import listing_colors, listing_price
+
+# 'listed' is listing order (oldest 'listed_at' first), the default without a text query
+SORTS = ('relevance', 'listed', 'price_asc', 'price_desc')
+
+# ============================================
+# FILTERS
+# ============================================
+
+class Filter:
+    """One query filter backed by an index"""
+
+    name = 'filter'
+
+    def estimate(self, index):
+        """Number of active listings the filter matches"""
+        raise NotImplementedError
+
+    def ids(self, index):
+        """Ids of the active listings the filter matches"""
+        raise NotImplementedError
+
+    def test(self, listing):
+        """Check a single listing against the filter"""
+        raise NotImplementedError
+
+class TextFilter(Filter):
+    """name= / q= via the search index (results ranked by relevance)"""
+
+    name = 'text'
+
+    def __init__(self, name='', q=''):
+        self.name_query = name
+        self.q = q
+        self._ids = None
+        self._set = None
+
+    def ids(self, index):
+        if self._ids is None:
+            # Ranked by name; listings sharing a name keep listing order
+            self._ids = []
+            self.keys = {}
+            for rank, card_name in index.search.ranked_names(name=self.name_query, q=self.q):
+                for doc_id in sorted(index.search.name_docs[card_name], key=lambda i: listing_key(index, i)):
+                    self._ids.append(doc_id)
+                    self.keys[doc_id] = rank + listing_key(index, doc_id)
+        return self._ids
+
+    def estimate(self, index):
+        return len(self.ids(index))
+
+    def test(self, listing):
+        if self._set is None:
+            self._set = set(self._ids)
+        return listing['id'] in self._set
+
+class ValueFilter(Filter):
+    """Case-insensitive substring match on a field with few distinct values
+    (set_code, rarity): matching values are found among the index keys"""
+
+    def __init__(self, field, text):
+        self.name = field
+        self.field = field
+        self.text = text.lower()
+
+    def buckets(self, index):
+        return [bucket for value, bucket in index.active_by[self.field].items() if self.text in value]
+
+    def estimate(self, index):
+        return sum(len(bucket) for bucket in self.buckets(index))
+
+    def ids(self, index):
+        return [i for bucket in self.buckets(index) for i in bucket]
+
+    def test(self, listing):
+        return self.text in str(listing.get(self.field) or '').lower()
+
+class SellerFilter(Filter):
+    name = 'seller'
+
+    def __init__(self, seller_id):
+        self.seller_id = seller_id
+
+    def estimate(self, index):
+        return len(index.active_by['seller_id'].get(self.seller_id, ()))
+
+    def ids(self, index):
+        return list(index.active_by['seller_id'].get(self.seller_id, ()))
+
+    def test(self, listing):
+        return listing.get('seller_id') == self.seller_id
+
+class ColorFilter(Filter):
+    """Listings having any of the given colors (W/U/B/R/G, C for colorless)"""
+
+    name = 'color'
+
+    def __init__(self, colors):
+        self.colors = [c.strip().upper() for c in colors if c.strip()]
+
+    def buckets(self, index):
+        return [index.active_by['color'][c] for c in self.colors if c in index.active_by['color']]
+
+    def estimate(self, index):
+        return sum(len(bucket) for bucket in self.buckets(index))
+
+    def ids(self, index):
+        buckets = self.buckets(index)
+        if len(buckets) == 1:
+            return list(buckets[0])
+        return list(dict.fromkeys(i for bucket in buckets for i in bucket))
+
+    def test(self, listing):
+        return any(c in self.colors for c in listing_colors(listing))
+
+class PriceFilter(Filter):
+    name = 'price'
+
+    def __init__(self, min_price=None, max_price=None):
+        self.min_price = min_price
+        self.max_price = max_price
+
+    def estimate(self, index):
+        return index.prices.count(self.min_price, self.max_price)
+
+    def ids(self, index):
+        return index.prices.ids(self.min_price, self.max_price)
+
+    def test(self, listing):
+        price = listing_price(listing)
+        return ((self.min_price is None or price >= self.min_price) and
+                (self.max_price is None or price <= self.max_price))
+
+# ============================================
+# QUERY
+# ============================================
+
+class ListingQuery:
+    """Filters and ordering for a listings request"""
+
+    def __init__(self, name='', q='', set_code='', seller_id=None, min_price=None, max_price=None,
+                 rarity='', color='', sort=''):
+        self.name = name
+        self.q = q
+        self.set_code = set_code
+        self.seller_id = seller_id
+        self.min_price = min_price
+        self.max_price = max_price
+        self.rarity = rarity
+        self.colors = [c for c in color.split(',') if c.strip()] if color else []
+        self.sort = sort if sort in SORTS else ''
+        if not self.sort or (self.sort == 'relevance' and not (name or q)):
+            self.sort = 'relevance' if (name or q) else 'listed'
+
+    @classmethod
+    def from_args(cls, args):
+        """Build a query from request.args"""
+        return cls(
+            name=args.get('name', ''),
+            q=args.get('q', ''),
+            set_code=args.get('set', ''),
+            seller_id=args.get('seller') or None,
+            min_price=args.get('min_price', type=float),
+            max_price=args.get('max_price', type=float),
+            rarity=args.get('rarity', ''),
+            color=args.get('color', ''),
+            sort=args.get('sort', ''),
+        )
+
+    def filters(self):
+        filters = []
+        if self.name or self.q:
+            filters.append(TextFilter(self.name, self.q))
+        if self.set_code:
+            filters.append(ValueFilter('set_code', self.set_code))
+        if self.seller_id:
+            filters.append(SellerFilter(self.seller_id))
+        if self.min_price is not None or self.max_price is not None:
+            filters.append(PriceFilter(self.min_price, self.max_price))
+        if self.rarity:
+            filters.append(ValueFilter('rarity', self.rarity))
+        if self.colors:
+            filters.append(ColorFilter(self.colors))
+        return filters
+
+# ============================================
+# CURSORS
+# ============================================
+
+class CursorError(ValueError):
+    """Cursor is malformed or belongs to a different sort order"""
+
+# Types of the fields of each sort order's key, checked on decode
+NUMBER = (int, float)
+CURSOR_KEYS = {
+    'relevance': (NUMBER, int, str, str, str),    # (-score, len(name), name, listed, id)
+    'listed': (str, str),
+    'price_asc': (NUMBER, str),
+    'price_desc': (NUMBER, str),
+}
+
+def encode_cursor(sort, key):
+    data = json.dumps({'s': sort, 'k': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort):
+    """Sort key stored in a cursor made by encode_cursor()"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        key = tuple(data['k'])
+    except (ValueError, KeyError, TypeError):
+        raise CursorError('Invalid cursor')
+    if data.get('s') != sort:
+        raise CursorError('Cursor does not match sort order')
+    types = CURSOR_KEYS.get(sort, ())
+    if len(key) != len(types) or any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(key, types)):
+        raise CursorError('Invalid cursor')
+    return key
+
+def listing_key(index, record_id):
+    """(listed_key, id) of a listing, its place in listing order"""
+    return (index.keys(record_id).listed, record_id)
+
+def sort_key(index, sort, record_id, text_filter=None):
+    """Stable position of a listing in a sort order"""
+    if sort == 'relevance':
+        return text_filter.keys[record_id]
+    if sort in ('price_asc', 'price_desc'):
+        return (listing_price(index.get(record_id)), record_id)
+    return listing_key(index, record_id)
+
+def seek(ids, key_of, after, descending=False):
+    """Position of the first id that sorts after `after` in an ordered list"""
+    lo, hi = 0, len(ids)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        key = key_of(ids[mid])
+        if (key < after) if descending else (key > after):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+# ============================================
+# PLANNER
+# ============================================
+
+def order_ids(index, ids, sort):
+    """Put candidate ids into the requested order; returns (ids, method)"""
+    reverse = sort == 'price_desc'
+    sorted_index = index.prices if sort in ('price_asc', 'price_desc') else index.order
+    if len(ids) * 8 < len(sorted_index):
+        if sorted_index is index.prices:
+            key = lambda i: (listing_price(index.get(i)), i)
+        else:
+            key = lambda i: listing_key(index, i)
+        return sorted(ids, key=key, reverse=reverse), 'sort'
+    # Most listings survive: walk the sorted index instead of sorting
+    wanted = set(ids)
+    return [i for i in sorted_index.ids(reverse=reverse) if i in wanted], 'index walk'
+
+def filter_candidates(index, filters, estimates, stages):
+    """Ids matching every filter, starting from the first one
+
+    Returns (ids, order the ids are in: 'relevance', 'price_asc' or None).
+    """
+    driver = filters[0]
+    candidates = driver.ids(index)
+    ordered_by = {'text': 'relevance', 'price': 'price_asc'}.get(driver.name)
+    stages.append({'filter': driver.name, 'method': 'index', 'estimate': estimates[id(driver)],
+                   'candidates': len(candidates)})
+
+    for f in filters[1:]:
+        if not candidates:
+            break
+        if estimates[id(f)] < len(candidates):
+            matching = set(f.ids(index))
+            candidates = [i for i in candidates if i in matching]
+            method = 'intersect'
+        else:
+            get = index.get
+            candidates = [i for i in candidates if f.test(get(i))]
+            method = 'scan'
+        stages.append({'filter': f.name, 'method': method, 'estimate': estimates[id(f)],
+                       'candidates': len(candidates)})
+    return candidates, ordered_by
+
+def slice_sorted(sorted_index, lo, hi, offset, limit, after, reverse):
+    """Page of a SortedIndex range without listing the whole range"""
+    entries = sorted_index.entries
+    start, stop = sorted_index.bounds(lo, hi)
+    total = stop - start
+    if not reverse:
+        if after is not None:
+            start = max(start, bisect_right(entries, after))
+        else:
+            start += offset
+        page = entries[start:min(stop, start + limit)]
+        more = start + limit < stop
+    else:
+        if after is not None:
+            stop = min(stop, bisect_left(entries, after))
+        else:
+            stop -= offset
+        first = max(start, stop - limit)
+        page = entries[first:max(first, stop)][::-1]
+        more = first > start
+    return [record_id for _, record_id in page], total, more
+
+def run_query(index, query, offset=0, limit=100, cursor=None, explain=False):
+    """Run a ListingQuery against a ListingIndex
+
+    Returns (page of listing ids, total matches, next cursor or None, plan)
+    where plan is None unless explain. Raises CursorError for a bad cursor.
+    """
+    started = time.perf_counter()
+    after = decode_cursor(cursor, query.sort) if cursor else None
+    offset = max(offset, 0)
+    limit = max(limit, 0)
+    stages = []
+    filters = query.filters()
+    estimates = {id(f): f.estimate(index) for f in filters}
+    filters.sort(key=lambda f: estimates[id(f)])
+    text_filter = next((f for f in filters if isinstance(f, TextFilter)), None)
+    price_sort = query.sort in ('price_asc', 'price_desc')
+
+    if not filters or (len(filters) == 1 and filters[0].name == 'price' and price_sort):
+        # Answer straight from the sorted index: cost is the page, not the range
+        price = filters[0] if filters else None
+        sorted_index = index.prices if price_sort else index.order
+        lo, hi = (price.min_price, price.max_price) if price else (None, None)
+        page, total, more = slice_sorted(sorted_index, lo, hi, offset, limit, after,
+                                         reverse=query.sort == 'price_desc')
+        stages.append({'filter': price.name if price else 'status', 'method': 'index',
+                       'estimate': total, 'candidates': total})
+        order_method = 'index'
+    else:
+        if query.sort == 'relevance':
+            # Ranked text hits drive the plan so their order is kept
+            filters.remove(text_filter)
+            filters.insert(0, text_filter)
+        candidates, ordered_by = filter_candidates(index, filters, estimates, stages)
+
+        if ordered_by == query.sort:
+            order_method = 'index'
+        elif ordered_by == 'price_asc' and query.sort == 'price_desc':
+            candidates.reverse()
+            order_method = 'index'
+        else:
+            candidates, order_method = order_ids(index, candidates, query.sort)
+
+        total = len(candidates)
+        if after is not None:
+            key_of = lambda i: sort_key(index, query.sort, i, text_filter)
+            offset = seek(candidates, key_of, after, descending=query.sort == 'price_desc')
+        page = candidates[offset:offset + limit]
+        more = offset + limit < total
+
+    next_cursor = None
+    if more and page:
+        next_cursor = encode_cursor(query.sort, sort_key(index, query.sort, page[-1], text_filter))
+
+    plan = None
+    if explain:
+        plan = {
+            'stages': stages,
+            'order': {'sort': query.sort, 'method': order_method},
+            'pagination': 'cursor' if after is not None else 'offset',
+            'total': total,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+    return page, total, next_cursor, plan
+
+# ============================================
+# FACETS
+# ============================================
+
+FACETS = ('set', 'rarity', 'color', 'seller')
+
+# Facet name -> ListingIndex.active_by field
+FACET_FIELDS = {'set': 'set_code', 'rarity': 'rarity', 'color': 'color', 'seller': 'seller_id'}
+
+def facet_counts(index, query):
+    """Active listing counts per set, rarity, color and seller under the
+    query's filters; returns (total, {facet: {value: count}})"""
+    filters = query.filters()
+    if not filters:
+        # Unfiltered counts are just the sizes of the maintained buckets
+        counts = {facet: {value: len(bucket) for value, bucket in index.active_by[FACET_FIELDS[facet]].items()}
+                  for facet in FACETS}
+        return len(index.active()), counts
+
+    estimates = {id(f): f.estimate(index) for f in filters}
+    filters.sort(key=lambda f: estimates[id(f)])
+    candidates, _ = filter_candidates(index, filters, estimates, [])
+    counts = {facet: {} for facet in FACETS}
+    sets, rarities, colors, sellers = (counts[f] for f in FACETS)
+    for record_id in candidates:
+        keys = index.keys(record_id)
+        sets[keys.set_code] = sets.get(keys.set_code, 0) + 1
+        rarities[keys.rarity] = rarities.get(keys.rarity, 0) + 1
+        sellers[keys.seller_id] = sellers.get(keys.seller_id, 0) + 1
+        for color in keys.colors:
+            colors[color] = colors.get(color, 0) + 1
+    return len(candidates), counts
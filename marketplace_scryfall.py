@@ -0,0 +1,216 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Scryfall Client
+
+Scryfall API access for enrichment:
+  - one requests.Session with a keep-alive connection pool shared by all
+    threads, instead of a new connection per lookup
+  - single-flight: concurrent misses on the same card wait for the one
+    request already in flight rather than each calling the API
+  - token-bucket rate limiting (Scryfall asks for at most ~10 requests/s),
+    which only blocks when the budget is actually used up
+  - batch lookups through /cards/collection, up to 75 cards per request
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from marketplace_catalog import card_data, card_names, catalog_name
+from marketplace_enrichment import enrichment_key
+
+DEFAULT_BASE_URL = 'https://api.scryfall.com'
+
+# Most identifiers /cards/collection accepts per request
+COLLECTION_LIMIT = 75
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class _Flight:
+    """A fetch in progress that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class ScryfallClient:
+    """Cached, coalesced and rate-limited Scryfall lookups
+
+    cache needs lookup(key) -> (found, data) and put(key, data), see
+    marketplace_cache.ScryfallCache.
+    """
+
+    def __init__(self, cache, base_url=DEFAULT_BASE_URL, rate=10, burst=None, timeout=5, pool_size=10):
+        self.cache = cache
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'User-Agent': 'NEXUS-Marketplace/3.0', 'Accept': 'application/json'})
+        self.stats = {'requests': 0, 'batch_requests': 0, 'coalesced': 0, 'errors': 0, 'throttled_seconds': 0.0}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def named(self, card_name, set_code=None):
+        """Card data for a card name (optionally a set), or None if not found"""
+        cache_key = enrichment_key(card_name, set_code)
+        found, cached = self.cache.lookup(cache_key)
+        if found:
+            return cached
+
+        with self._lock:
+            flight = self._inflight.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[cache_key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+        if not leader:
+            flight.done.wait()
+            return flight.result
+
+        try:
+            flight.result = self._fetch_named(cache_key, card_name, set_code)
+        finally:
+            with self._lock:
+                del self._inflight[cache_key]
+            flight.done.set()
+        return flight.result
+
+    def _fetch_named(self, cache_key, card_name, set_code):
+        params = {'fuzzy': card_name}
+        if set_code:
+            params['set'] = set_code
+        try:
+            self.stats['throttled_seconds'] += self.limiter.acquire()
+            self.stats['requests'] += 1
+            response = self.session.get(f'{self.base_url}/cards/named', params=params, timeout=self.timeout)
+
+            if response.status_code == 200:
+                result = card_data(response.json())
+                self.cache.put(cache_key, result)
+                return result
+            if response.status_code == 404:
+                # Remember misses so unknown cards are not looked up on every request
+                self.cache.put(cache_key, None)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Scryfall error for {card_name}: {e}")
+        return None
+
+    def collection(self, cards):
+        """Card data for many (card_name, set_code) pairs -> {cache key: data or None}
+
+        Cache misses are looked up COLLECTION_LIMIT at a time. Names the
+        collection endpoint does not match exactly fall back to the fuzzy
+        /cards/named lookup.
+        """
+        results = {}
+        wanted = {}
+        for card_name, set_code in cards:
+            cache_key = enrichment_key(card_name, set_code)
+            if cache_key in results or cache_key in wanted:
+                continue
+            found, cached = self.cache.lookup(cache_key)
+            if found:
+                results[cache_key] = cached
+            else:
+                wanted[cache_key] = (card_name, set_code)
+
+        pending = list(wanted.items())
+        for i in range(0, len(pending), COLLECTION_LIMIT):
+            chunk = pending[i:i + COLLECTION_LIMIT]
+            matched = self._fetch_collection(chunk)
+            for cache_key, (card_name, set_code) in chunk:
+                if matched is None:
+                    results[cache_key] = None
+                elif cache_key in matched:
+                    results[cache_key] = matched[cache_key]
+                else:
+                    results[cache_key] = self.named(card_name, set_code)
+        return results
+
+    def _fetch_collection(self, chunk):
+        """{cache key: data} for the chunk entries Scryfall matched, or None on error"""
+        identifiers = []
+        for _, (card_name, set_code) in chunk:
+            identifier = {'name': card_name}
+            if set_code:
+                identifier['set'] = set_code
+            identifiers.append(identifier)
+        try:
+            self.stats['throttled_seconds'] += self.limiter.acquire()
+            self.stats['requests'] += 1
+            self.stats['batch_requests'] += 1
+            response = self.session.post(f'{self.base_url}/cards/collection',
+                                         json={'identifiers': identifiers}, timeout=self.timeout)
+            if response.status_code != 200:
+                raise ValueError(f'HTTP {response.status_code}')
+            cards = response.json().get('data', [])
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Scryfall collection error ({len(chunk)} cards): {e}")
+            return None
+
+        # Results come back without the identifiers, so match them by name (and set)
+        by_name = {}
+        for card in cards:
+            data = card_data(card)
+            set_code = str(card.get('set') or '').lower()
+            for name in card_names(card):
+                by_name[(name, set_code)] = data
+                by_name.setdefault((name, ''), data)
+        matched = {}
+        for cache_key, (card_name, set_code) in chunk:
+            data = by_name.get((catalog_name(card_name), str(set_code or '').lower()))
+            if data is not None:
+                self.cache.put(cache_key, data)
+                matched[cache_key] = data
+        return matched
+
+    def info(self):
+        """Counters for /status"""
+        return dict(self.stats, throttled_seconds=round(self.stats['throttled_seconds'], 3))
@@ -0,0 +1,213 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Search
+
+Inverted index over listing card names (and the Scryfall type_line /
+oracle_text when present) for /api/listings.
+
+  name=<text>  substring match on the card name, answered from a trigram
+               index instead of lowercasing every listing per request
+  q=<text>     token search over name, type line and rules text; every
+               token must match as a prefix, whole-word matches rank higher
+
+Many listings share a card name, so terms are indexed once per distinct
+name and each name maps to the listings carrying it.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Term weights per field for q= ranking
+NAME_WEIGHT = 3
+TYPE_WEIGHT = 2
+TEXT_WEIGHT = 1
+
+def normalize(text):
+    """Casefold and strip accents ('Lim-Dûl' -> 'lim-dul')"""
+    text = text or ''
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    """Token + trigram index over card names, keyed by listing id"""
+
+    def __init__(self):
+        self.doc_name = {}        # listing id -> normalized card name
+        self.name_docs = {}       # normalized card name -> {listing id: None}
+        self.name_terms = {}      # normalized card name -> {token: weight}
+        self.name_text = {}       # normalized card name -> (type_line, oracle_text) indexed
+        self.postings = {}        # token -> {normalized card name: weight}
+        self.trigram_names = {}   # trigram -> {normalized card name}
+        self.vocabulary = []      # sorted tokens, for prefix expansion
+
+    def __len__(self):
+        return len(self.doc_name)
+
+    # --- maintenance ---
+
+    def add(self, doc_id, card_name, type_line='', oracle_text=''):
+        """Index a listing (re-adding an indexed listing refreshes it)"""
+        name = normalize(card_name)
+        if self.doc_name.get(doc_id) != name:
+            self.remove(doc_id)
+            self.doc_name[doc_id] = name
+            if name not in self.name_docs:
+                self.name_docs[name] = {}
+                self._index_name(name)
+            self.name_docs[name][doc_id] = None
+        if (type_line or oracle_text) and self.name_text.get(name) != (type_line, oracle_text):
+            self.name_text[name] = (type_line, oracle_text)
+            self._set_terms(name, self._terms(name, type_line, oracle_text))
+
+    def remove(self, doc_id):
+        """Drop a listing from the index (no-op if missing)"""
+        name = self.doc_name.pop(doc_id, None)
+        if name is None:
+            return
+        docs = self.name_docs[name]
+        docs.pop(doc_id, None)
+        if not docs:
+            del self.name_docs[name]
+            self._set_terms(name, {})
+            del self.name_terms[name]
+            self.name_text.pop(name, None)
+            for gram in trigrams(name):
+                names = self.trigram_names[gram]
+                names.discard(name)
+                if not names:
+                    del self.trigram_names[gram]
+
+    def _terms(self, name, type_line='', oracle_text=''):
+        terms = {}
+        for tokens, weight in ((TOKEN_RE.findall(name), NAME_WEIGHT),
+                               (tokenize(type_line), TYPE_WEIGHT),
+                               (tokenize(oracle_text), TEXT_WEIGHT)):
+            for token in tokens:
+                terms[token] = max(terms.get(token, 0), weight)
+        return terms
+
+    def _index_name(self, name):
+        self.name_terms[name] = {}
+        self._set_terms(name, self._terms(name))
+        for gram in trigrams(name):
+            self.trigram_names.setdefault(gram, set()).add(name)
+
+    def _set_terms(self, name, terms):
+        for token in self.name_terms.get(name, {}):
+            if token not in terms:
+                posting = self.postings[token]
+                del posting[name]
+                if not posting:
+                    del self.postings[token]
+                    del self.vocabulary[bisect_left(self.vocabulary, token)]
+        for token, weight in terms.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                insort(self.vocabulary, token)
+            self.postings[token][name] = weight
+        self.name_terms[name] = terms
+
+    # --- queries ---
+
+    def expand_prefix(self, prefix):
+        """Indexed tokens starting with prefix"""
+        i = bisect_left(self.vocabulary, prefix)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(prefix):
+            yield self.vocabulary[i]
+            i += 1
+
+    def names_containing(self, text):
+        """Card names containing text as a substring"""
+        text = normalize(text)
+        if not text:
+            return set(self.name_docs)
+        if len(text) < 3:
+            return {name for name in self.name_docs if text in name}
+        sets = sorted((self.trigram_names.get(gram, set()) for gram in trigrams(text)), key=len)
+        if not sets[0]:
+            return set()
+        candidates = set.intersection(*sets)
+        return {name for name in candidates if text in name}
+
+    def names_matching(self, query):
+        """Card names where every token of query prefixes a term -> relevance score"""
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+        scores = None
+        for token in tokens:
+            matched = {}
+            for term in self.expand_prefix(token):
+                exact = term == token
+                for name, weight in self.postings[term].items():
+                    score = weight if exact else weight / 2
+                    if score > matched.get(name, 0):
+                        matched[name] = score
+            if scores is None:
+                scores = matched
+            else:
+                scores = {name: scores[name] + score for name, score in matched.items() if name in scores}
+            if not scores:
+                return {}
+        return scores
+
+    def name_score(self, name, text):
+        """Relevance of a card name for a name= substring query"""
+        if name == text:
+            return 4
+        if name.startswith(text):
+            return 3
+        if any(token.startswith(text) for token in TOKEN_RE.findall(name)):
+            return 2
+        return 1
+
+    def ranked_names(self, name=None, q=None):
+        """(rank key, card name) pairs matching the query, best first
+
+        Rank keys sort ascending and stay comparable across requests, so they
+        can be used as pagination cursors.
+        """
+        scores = None
+        if name:
+            text = normalize(name)
+            scores = {n: self.name_score(n, text) for n in self.names_containing(text)}
+        if q:
+            token_scores = self.names_matching(q)
+            full = normalize(q).strip()
+            if scores is None:
+                scores = {n: s + (NAME_WEIGHT if n == full else 0) for n, s in token_scores.items()}
+            else:
+                scores = {n: s + token_scores[n] for n, s in scores.items() if n in token_scores}
+        if scores is None:
+            scores = dict.fromkeys(self.name_docs, 0)
+        return sorted(((-score, len(n), n), n) for n, score in scores.items())
+
+    def search(self, name=None, q=None):
+        """Listing ids matching the query, best matches first"""
+        return [doc_id for _, n in self.ranked_names(name, q) for doc_id in self.name_docs[n]]
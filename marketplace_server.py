@@ -21,42 +21,66 @@ Multi-Seller Platform with Cart & Checkout
 Features:
 - Multi-seller support with API key authentication
 - Real-time listing sync from NEXUS V2 desktop
-- Shopping cart (session-based)
-- Order management
-- Scryfall enrichment
+- Shopping cart (created on first add, idle carts expire; optionally in a signed cookie)
+- Order management (all-or-nothing checkout, Idempotency-Key retries)
+- Scryfall enrichment (local catalog from bulk data, background queue otherwise)
+- Local card image cache with thumbnails (see marketplace_images.py)
+- Pluggable storage (journaled JSON files or SQLite, see marketplace_storage.py);
+  with SQLite several gunicorn workers can share the data
 
 Endpoints:
   PUBLIC:
     GET  /                      - Marketplace frontend
     GET  /api/listings          - Browse all active listings
+    GET  /api/listings/facets   - Set/rarity/color/seller counts
     GET  /api/listings/<id>     - Single listing details
+    GET  /img/<id>/<size>       - Cached card image (thumb or normal)
     GET  /api/sellers           - List sellers
     GET  /api/cart              - View cart (cookie session)
     POST /api/cart/add          - Add to cart
     POST /api/cart/remove       - Remove from cart
     POST /api/cart/clear        - Clear cart
-    POST /api/checkout          - Create order
+    POST /api/checkout          - Create orders (honours Idempotency-Key)
     
   SELLER (API Key Required):
     POST /api/seller/register   - Register new seller
+    POST /api/seller/key/rotate - Issue a new API key
     POST /api/seller/sync       - Sync listings from V2
+    POST /api/v2/seller/sync    - Streaming sync (NDJSON or JSON array body)
+    GET  /api/seller/sync/<job> - Progress of an async (?async=1) sync
+    GET  /api/seller/sync/manifest - Listing content hashes + sync version
+    POST /api/seller/sync/delta - Changed listings + tombstones since a version
     GET  /api/seller/listings   - View own listings
     GET  /api/seller/orders     - View incoming orders
     POST /api/seller/order/<id>/update - Update order status
 """
 
-from flask import Flask, jsonify, request, send_file, session, make_response
+from flask import Flask, jsonify, request, send_file, session, make_response, redirect
 from flask_cors import CORS
-import json
+from werkzeug.exceptions import HTTPException
 import os
 import uuid
 import hashlib
 import secrets
+import threading
+import shutil
+import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
-import requests
 import time
 from functools import wraps
+from marketplace_storage import load_json, save_json, open_storage
+from marketplace_index import ListingIndex, OrderIndex, ApiKeyIndex, hash_api_key, migrate_api_keys, migrate_listed_at
+from marketplace_query import ListingQuery, CursorError, run_query, facet_counts
+from marketplace_enrichment import EnrichmentQueue
+from marketplace_catalog import open_catalog
+from marketplace_cache import ScryfallCache
+from marketplace_scryfall import ScryfallClient, DEFAULT_BASE_URL
+from marketplace_images import ImageCache, SIZES as IMAGE_SIZES, DEFAULT_SOURCES, MAX_IMAGE_BYTES
+from marketplace_sync import read_listings, batched, content_hash
+from marketplace_jobs import JobRunner
+from marketplace_carts import CartStore, CookieCarts
+from marketplace_views import PublicListingView, public_listing, image_version, encode_json
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', secrets.token_hex(32))
@@ -66,38 +90,187 @@ CORS(app, supports_credentials=True)
 # DATA STORAGE
 # ============================================
 
-DATA_DIR = Path(__file__).parent / 'data'
+DATA_DIR = Path(os.environ.get('NEXUS_DATA_DIR', Path(__file__).parent / 'data'))
 DATA_DIR.mkdir(exist_ok=True)
 
-SELLERS_FILE = DATA_DIR / 'sellers.json'
-LISTINGS_FILE = DATA_DIR / 'listings.json'
-ORDERS_FILE = DATA_DIR / 'orders.json'
-CARTS_FILE = DATA_DIR / 'carts.json'
-SCRYFALL_CACHE = DATA_DIR / 'scryfall_cache.json'
-
-def load_json(filepath, default=None):
-    """Load JSON file with default fallback"""
-    if default is None:
-        default = {}
-    if filepath.exists():
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            pass
-    return default
+# Scryfall lookups (data/scryfall_cache.json is imported once if present)
+SCRYFALL_CACHE = DATA_DIR / 'scryfall_cache.db'
+SCRYFALL_CACHE_LEGACY = DATA_DIR / 'scryfall_cache.json'
+SCRYFALL_CACHE_SIZE = int(os.environ.get('NEXUS_SCRYFALL_CACHE_SIZE', 20000))
+SCRYFALL_URL = os.environ.get('NEXUS_SCRYFALL_URL', DEFAULT_BASE_URL)
+SCRYFALL_RATE = float(os.environ.get('NEXUS_SCRYFALL_RATE', 10))    # requests per second
+
+# Content-addressed card image cache served from /img/<listing_id>/<size>
+IMAGE_DIR = Path(os.environ.get('NEXUS_IMAGE_DIR', DATA_DIR / 'images'))
+# Only image_url values on these origins are downloaded (comma-separated)
+IMAGE_SOURCES = [s.strip() for s in os.environ.get('NEXUS_IMAGE_SOURCES', ','.join(DEFAULT_SOURCES)).split(',') if s.strip()]
+IMAGE_MAX_BYTES = int(os.environ.get('NEXUS_IMAGE_MAX_BYTES', MAX_IMAGE_BYTES))
+
+# Listings applied per transaction by the streaming sync
+SYNC_BATCH_SIZE = int(os.environ.get('NEXUS_SYNC_BATCH_SIZE', 2000))
+# Async sync bodies are buffered in memory up to this size, then on disk
+SYNC_SPOOL_BYTES = int(os.environ.get('NEXUS_SYNC_SPOOL_BYTES', 8 * 1024 * 1024))
 
-def save_json(filepath, data):
-    """Save data to JSON file"""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, default=str)
+# Carts are created on the first add and dropped after this many idle seconds
+CART_TTL = int(os.environ.get('NEXUS_CART_TTL', 7 * 24 * 3600))
+CART_SWEEP_INTERVAL = int(os.environ.get('NEXUS_CART_SWEEP_INTERVAL', 3600))
+# 'server' keeps every cart in the cart store; 'cookie' keeps small carts in a
+# signed cookie and only stores the ones that outgrow NEXUS_CART_COOKIE_BYTES
+CART_MODE = os.environ.get('NEXUS_CART_MODE', 'server').lower()
+CART_COOKIE = 'cart'
+CART_COOKIE_BYTES = int(os.environ.get('NEXUS_CART_COOKIE_BYTES', 3072))
+
+# Local card catalog built by `python marketplace_catalog.py import <bulk-data.json>`
+CATALOG_PATH = Path(os.environ.get('NEXUS_CATALOG_PATH', DATA_DIR / 'scryfall_catalog.db'))
+# Set to enrich from the catalog only, never calling the Scryfall API
+SCRYFALL_OFFLINE = os.environ.get('NEXUS_SCRYFALL_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+# Storage engine: 'journal' (JSON snapshot + append-only journal per collection),
+# 'json' (whole file rewritten per change) or 'sqlite' (data/marketplace.db).
+# Only journal and sqlite persist a checkout's orders and stock all or nothing
+STORAGE_ENGINE = os.environ.get('NEXUS_STORAGE', 'journal')
+storage = open_storage(STORAGE_ENGINE, DATA_DIR, os.environ.get('NEXUS_DB_PATH'))
 
 # Load initial data
-sellers = load_json(SELLERS_FILE, {})
-listings = load_json(LISTINGS_FILE, [])
-orders = load_json(ORDERS_FILE, [])
-carts = load_json(CARTS_FILE, {})
-scryfall_cache = load_json(SCRYFALL_CACHE, {})
+sellers = storage.load('sellers')
+
+# Sellers registered before API keys were hashed still store the raw key
+migrated_sellers = migrate_api_keys(sellers)
+if migrated_sellers:
+    with storage.transaction():
+        for seller_id in migrated_sellers:
+            storage.put('sellers', sellers[seller_id], seller_id)
+    print(f'Replaced {len(migrated_sellers)} stored seller API keys with their digests')
+
+scryfall_cache = ScryfallCache(SCRYFALL_CACHE, max_entries=SCRYFALL_CACHE_SIZE, legacy_path=SCRYFALL_CACHE_LEGACY)
+card_catalog = open_catalog(CATALOG_PATH)
+scryfall_client = ScryfallClient(scryfall_cache, base_url=SCRYFALL_URL, rate=SCRYFALL_RATE)
+image_cache = ImageCache(IMAGE_DIR, sources=IMAGE_SOURCES, max_bytes=IMAGE_MAX_BYTES)
+
+# Background sync jobs, run one at a time per seller; data/jobs.db lets any
+# worker process answer a status poll and keeps a seller's jobs one at a time
+# across worker processes too
+sync_jobs = JobRunner(workers=int(os.environ.get('NEXUS_SYNC_WORKERS', 2)), db_path=DATA_DIR / 'jobs.db')
+
+# Listings stored before listing order was persisted get their 'listed_at'
+stored_listings = storage.load('listings')
+migrated_listings = migrate_listed_at(stored_listings)
+if migrated_listings:
+    with storage.transaction():
+        for listing in migrated_listings:
+            storage.put('listings', listing)
+    print(f'Recorded listed_at on {len(migrated_listings)} stored listings')
+
+# Listing/order indexes (kept in step with every mutation below); they hold
+# the in-memory copy of every listing and order
+listing_index = ListingIndex(stored_listings)
+order_index = OrderIndex(storage.load('orders'))
+api_key_index = ApiKeyIndex(sellers)
+
+# What the public endpoints serve: active listings with seller info joined,
+# kept up to date by listing_index
+public_listings = PublicListingView(sellers)
+listing_index.attach(public_listings)
+
+# Guards the collections and indexes above; request handlers and the
+# enrichment workers both change them
+state_lock = threading.RLock()
+
+def with_state_lock(f):
+    """Decorator to run a handler while holding state_lock
+
+    Handlers first catch up with other worker processes (refresh_state).
+    Anything but a GET/HEAD also runs inside one storage transaction, which
+    on SQLite holds the database write lock from the start, so nothing the
+    handler checked can be changed by another worker before it commits.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        with state_lock:
+            if request.method in ('GET', 'HEAD'):
+                refresh_state()
+                return f(*args, **kwargs)
+            try:
+                with storage.transaction():
+                    refresh_state()
+                    return f(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception:
+                # The writes were rolled back; memory may still hold them
+                reload_state()
+                raise
+    return decorated
+
+cart_store = CartStore(storage, ttl=CART_TTL, lock=state_lock)
+cart_store.start_sweeper(CART_SWEEP_INTERVAL)
+cookie_carts = None
+if CART_MODE == 'cookie':
+    cookie_carts = CookieCarts(app.secret_key, max_bytes=CART_COOKIE_BYTES, ttl=CART_TTL)
+    if not os.environ.get('FLASK_SECRET_KEY'):
+        print('Warning: NEXUS_CART_MODE=cookie without FLASK_SECRET_KEY - cart cookies are signed '
+              'with a random per-process key, so other workers and restarts will not accept them')
+
+# ============================================
+# MULTI-WORKER STATE
+# ============================================
+
+# Each gunicorn worker keeps its own copy of the collections above. With
+# NEXUS_STORAGE=sqlite they share one database and every write is logged,
+# so a worker catches up on the others' writes before each request and
+# before each write transaction. The json and journal engines are not safe
+# to share between processes.
+if STORAGE_ENGINE != 'sqlite' and int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+    print(f'Warning: WEB_CONCURRENCY > 1 with NEXUS_STORAGE={STORAGE_ENGINE} - workers will not see '
+          'each other\'s changes and can overwrite them; use NEXUS_STORAGE=sqlite')
+
+def refresh_record(index, record_id, record):
+    """Apply one changed listing or order (None = deleted) to memory"""
+    current = index.get(record_id)
+    if record is None:
+        index.remove(record_id)
+    elif current is not None:
+        # In place, so references held elsewhere see the new values
+        current.clear()
+        current.update(record)
+        index.reindex(current)
+    else:
+        index.reindex(record)
+
+def refresh_state():
+    """Apply the changes other worker processes wrote since we last looked"""
+    with state_lock:
+        changed = storage.changes()
+        if changed is None:
+            reload_state()
+            return
+        for seller_id, seller in changed.get('sellers', {}).items():
+            if seller is None:
+                sellers.pop(seller_id, None)
+                api_key_index.remove(seller_id)
+            else:
+                sellers.setdefault(seller_id, {}).clear()
+                sellers[seller_id].update(seller)
+                api_key_index.reindex(seller_id, sellers[seller_id])
+            public_listings.update_seller(seller_id)
+        for listing_id, listing in changed.get('listings', {}).items():
+            refresh_record(listing_index, listing_id, listing)
+        for order_id, order in changed.get('orders', {}).items():
+            refresh_record(order_index, order_id, order)
+        for cart_id, cart in changed.get('carts', {}).items():
+            cart_store.refresh(cart_id, cart)
+
+def reload_state():
+    """Reload every collection from storage and rebuild the indexes"""
+    with state_lock:
+        sellers.clear()
+        sellers.update(storage.load('sellers'))
+        api_key_index.rebuild(sellers)
+        listing_index.rebuild(storage.load('listings'))
+        order_index.rebuild(storage.load('orders'))
+        cart_store.reload()
+
+storage.before_write = refresh_state
 
 # ============================================
 # AUTHENTICATION
@@ -110,31 +283,52 @@ def require_api_key(f):
         api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
         if not api_key:
             return jsonify({'error': 'API key required'}), 401
+        refresh_state()
         
-        # Find seller by API key
-        seller = None
-        for seller_id, s in sellers.items():
-            if s.get('api_key') == api_key:
-                seller = s
-                seller['id'] = seller_id
-                break
-        
-        if not seller:
+        # Find seller by hashed API key
+        seller_id = api_key_index.lookup(api_key)
+        if seller_id is None or seller_id not in sellers:
             return jsonify({'error': 'Invalid API key'}), 401
         
-        # Inject seller into request context
-        request.seller = seller
+        # Inject seller into request context (a copy, stored record is untouched)
+        request.seller = dict(sellers[seller_id], id=seller_id)
         return f(*args, **kwargs)
     return decorated
 
-def get_or_create_cart_id():
-    """Get cart ID from cookie or create new one"""
+def current_cart():
+    """(cart_id, cart) for the request, or (None, None) if it has no cart
+
+    cart_id is None for a cart carried in the signed cookie.
+    """
     cart_id = request.cookies.get('cart_id')
-    if not cart_id or cart_id not in carts:
-        cart_id = str(uuid.uuid4())
-        carts[cart_id] = {'items': [], 'created': datetime.now().isoformat()}
-        save_json(CARTS_FILE, carts)
-    return cart_id
+    cart = cart_store.get(cart_id)
+    if cart is not None:
+        return cart_id, cart
+    if cookie_carts is not None:
+        return None, cookie_carts.load(request.cookies.get(CART_COOKIE))
+    return None, None
+
+def set_cart_cookie(response, cart_id):
+    response.set_cookie('cart_id', cart_id, max_age=CART_TTL, samesite='Lax')
+    return response
+
+def clear_cart_cookie(response):
+    """Drop the signed cart cookie if the request sent one"""
+    if CART_COOKIE in request.cookies:
+        response.delete_cookie(CART_COOKIE)
+    return response
+
+def save_cart(response, cart_id, cart):
+    """Store a changed cart and set the cookie that finds it again"""
+    if cart_id is None and cookie_carts is not None:
+        value = cookie_carts.dump(cart)
+        if value is not None:
+            response.set_cookie(CART_COOKIE, value, max_age=CART_TTL, samesite='Lax')
+            return response
+        # Too big for a cookie: promote it to the server-side store
+        clear_cart_cookie(response)
+    cart_id = cart_store.save(cart_id, cart)
+    return set_cart_cookie(response, cart_id)
 
 # ============================================
 # SCRYFALL INTEGRATION
@@ -142,62 +336,62 @@ def get_or_create_cart_id():
 
 def fetch_from_scryfall(card_name, set_code=None):
     """Fetch card data from Scryfall with caching"""
-    cache_key = f"{card_name}|{set_code or 'any'}".lower()
-    
-    if cache_key in scryfall_cache:
-        cached = scryfall_cache[cache_key]
-        if cached.get('timestamp', 0) > time.time() - (7 * 24 * 3600):
-            return cached.get('data')
-    
-    try:
-        url = 'https://api.scryfall.com/cards/named'
-        params = {'fuzzy': card_name}
-        if set_code:
-            params['set'] = set_code
-        
-        time.sleep(0.1)
-        response = requests.get(url, params=params, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            result = {
-                'image_url': data.get('image_uris', {}).get('normal', ''),
-                'image_small': data.get('image_uris', {}).get('small', ''),
-                'scryfall_price': float(data.get('prices', {}).get('usd', 0) or 0),
-                'type_line': data.get('type_line', ''),
-                'mana_cost': data.get('mana_cost', ''),
-                'oracle_text': data.get('oracle_text', ''),
-                'rarity': data.get('rarity', 'common'),
-                'set_name': data.get('set_name', ''),
-                'colors': data.get('colors', []),
-            }
-            
-            scryfall_cache[cache_key] = {'data': result, 'timestamp': time.time()}
-            if len(scryfall_cache) % 50 == 0:
-                save_json(SCRYFALL_CACHE, scryfall_cache)
-            
-            return result
-    except Exception as e:
-        print(f"Scryfall error for {card_name}: {e}")
-    
-    return None
-
-def enrich_listing(listing):
-    """Enrich listing with Scryfall data if needed"""
-    if not listing.get('image_url'):
-        scryfall_data = fetch_from_scryfall(listing.get('card_name'), listing.get('set_code'))
-        if scryfall_data:
-            listing.update({
-                'image_url': scryfall_data.get('image_url', ''),
-                'image_small': scryfall_data.get('image_small', ''),
-                'type_line': scryfall_data.get('type_line', ''),
-                'mana_cost': scryfall_data.get('mana_cost', ''),
-                'rarity': scryfall_data.get('rarity', 'common'),
-                'set_name': scryfall_data.get('set_name', ''),
-                'colors': scryfall_data.get('colors', []),
-            })
+    return scryfall_client.named(card_name, set_code)
+
+def apply_scryfall_data(listing, scryfall_data):
+    """Copy Scryfall card data onto a listing"""
+    listing.update({
+        'image_url': scryfall_data.get('image_url', ''),
+        'image_small': scryfall_data.get('image_small', ''),
+        'type_line': scryfall_data.get('type_line', ''),
+        'mana_cost': scryfall_data.get('mana_cost', ''),
+        'oracle_text': scryfall_data.get('oracle_text', ''),
+        'rarity': scryfall_data.get('rarity', 'common'),
+        'set_name': scryfall_data.get('set_name', ''),
+        'colors': scryfall_data.get('colors', []),
+    })
     return listing
 
+def on_enriched(scryfall_data, listing_ids):
+    """Patch listings waiting on a card once its data has been fetched"""
+    with state_lock:
+        with storage.transaction():
+            for listing_id in listing_ids:
+                listing = listing_index.get(listing_id)
+                # Skip listings removed or given an image since they were queued
+                if listing is None or listing.get('image_url'):
+                    continue
+                apply_scryfall_data(listing, scryfall_data)
+                listing_index.reindex(listing)
+                storage.put('listings', listing)
+
+# Listings missing card data are enriched off the request path, in
+# /cards/collection batches when several cards are waiting
+enrichment_queue = EnrichmentQueue(fetch_from_scryfall, on_enriched,
+                                   workers=int(os.environ.get('NEXUS_ENRICH_WORKERS', 2)),
+                                   fetch_many=scryfall_client.collection)
+
+def enrich_listing(listing, save=True):
+    """Fill in missing card data from the local catalog, or queue a
+    background Scryfall fetch; returns True if the listing changed
+    
+    With save=False the caller reindexes and persists the listing itself.
+    """
+    if listing.get('image_url') or not listing.get('card_name'):
+        return False
+    scryfall_data = None
+    if card_catalog is not None:
+        scryfall_data = card_catalog.lookup(listing['card_name'], listing.get('set_code'))
+    if not scryfall_data:
+        if not SCRYFALL_OFFLINE:
+            enrichment_queue.enqueue(listing)
+        return False
+    apply_scryfall_data(listing, scryfall_data)
+    if save:
+        listing_index.reindex(listing)
+        storage.put('listings', listing)
+    return True
+
 # ============================================
 # PUBLIC ENDPOINTS
 # ============================================
@@ -223,90 +417,162 @@ def health():
     return jsonify({'status': 'healthy', 'version': '3.0.0', 'timestamp': datetime.now().isoformat()})
 
 @app.route('/status')
+@with_state_lock
 def status():
-    active_listings = [l for l in listings if l.get('status') == 'Active']
     return jsonify({
-        'total_listings': len(active_listings),
+        'total_listings': len(listing_index.lookup('status', 'Active')),
         'total_sellers': len(sellers),
+        'enrichment': dict(enrichment_queue.stats, pending=enrichment_queue.pending()),
+        'catalog_cards': len(card_catalog) if card_catalog is not None else 0,
+        'scryfall_cache': scryfall_cache.info(),
+        'scryfall_client': scryfall_client.info(),
+        'images': image_cache.info(),
+        'sync_jobs': sync_jobs.info(),
+        'carts': cart_store.info(),
         'version': '3.0.0'
     })
 
 @app.route('/api/listings')
+@with_state_lock
 def get_listings():
-    """Get all active listings with optional filters"""
-    active = [l for l in listings if l.get('status') == 'Active']
-    
-    # Filters
-    name = request.args.get('name', '').lower()
-    set_code = request.args.get('set', '').lower()
-    seller_id = request.args.get('seller')
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    rarity = request.args.get('rarity', '').lower()
+    """Get all active listings with optional filters
+    
+    name= matches a substring of the card name, q= searches name, type line
+    and rules text; either one ranks results by relevance. sort=price_asc,
+    price_desc or listed (listing order) overrides that. explain=1 adds the
+    query plan to the response.
+    
+    Pages are offset/limit, or pass the returned next_cursor as cursor=
+    (with the same filters) for keyset pagination that stays stable while
+    listings change.
+    """
+    query = ListingQuery.from_args(request.args)
     limit = request.args.get('limit', 100, type=int)
     offset = request.args.get('offset', 0, type=int)
+    cursor = request.args.get('cursor')
+    explain = request.args.get('explain', '').lower() in ('1', 'true', 'yes')
     
-    filtered = active
-    
-    if name:
-        filtered = [l for l in filtered if name in l.get('card_name', '').lower()]
-    if set_code:
-        filtered = [l for l in filtered if set_code in l.get('set_code', '').lower()]
-    if seller_id:
-        filtered = [l for l in filtered if l.get('seller_id') == seller_id]
-    if min_price is not None:
-        filtered = [l for l in filtered if l.get('price', 0) >= min_price]
-    if max_price is not None:
-        filtered = [l for l in filtered if l.get('price', 0) <= max_price]
-    if rarity:
-        filtered = [l for l in filtered if rarity in l.get('rarity', '').lower()]
-    
-    # Add seller info to each listing and enrich with Scryfall data
-    for listing in filtered:
-        seller = sellers.get(listing.get('seller_id', ''), {})
-        listing['seller_name'] = seller.get('shop_name', 'Unknown Seller')
-        # Enrich with image if missing
-        if not listing.get('image_url'):
-            enrich_listing(listing)
-    
-    total = len(filtered)
-    paginated = filtered[offset:offset + limit]
+    try:
+        ids, total, next_cursor, plan = run_query(listing_index, query, offset=offset, limit=limit,
+                                                  cursor=cursor, explain=explain)
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'listings': paginated,
+    # Missing images come from the card catalog, or are fetched in the
+    # background and show up on a later request. Saving an enriched listing
+    # can apply other workers' changes first, so listings may drop out of
+    # the page here; they are skipped below
+    for i in ids:
+        public = public_listings.get(i)
+        if public is not None and not public.get('image_url'):
+            enrich_listing(listing_index.get(i))
+    
+    result = {
         'total': total,
         'offset': offset,
-        'limit': limit
-    })
+        'limit': limit,
+        'next_cursor': next_cursor
+    }
+    if plan is not None:
+        result['explain'] = plan
+    
+    # Only the requested page is served: the listings' cached JSON fragments
+    # are joined into the body instead of encoding every listing again
+    fragments = [f for f in map(public_listings.fragment, ids) if f is not None]
+    body = b'{"listings":[' + b','.join(fragments) + b'],' + encode_json(result)[1:]
+    return app.response_class(body, mimetype='application/json')
+
+@app.route('/api/listings/facets')
+@with_state_lock
+def get_listing_facets():
+    """Counts per set, rarity, color and seller for active listings
+    matching the same filters as /api/listings"""
+    total, counts = facet_counts(listing_index, ListingQuery.from_args(request.args))
+    
+    facets = {}
+    for facet, values in counts.items():
+        items = []
+        for value, count in values.items():
+            if not value:
+                continue
+            item = {'value': value, 'count': count}
+            if facet == 'seller':
+                item['label'] = sellers.get(value, {}).get('shop_name', 'Unknown Seller')
+            items.append(item)
+        items.sort(key=lambda i: (-i['count'], str(i['value'])))
+        facets[facet] = items
+    
+    return jsonify({'total': total, 'facets': facets})
 
 @app.route('/api/listings/<listing_id>')
+@with_state_lock
 def get_listing(listing_id):
     """Get single listing details"""
-    listing = next((l for l in listings if l.get('id') == listing_id), None)
+    listing = listing_index.get(listing_id)
     if not listing:
         return jsonify({'error': 'Listing not found'}), 404
     
     # Enrich with Scryfall data
-    listing = enrich_listing(listing)
+    enrich_listing(listing)
+    
+    fragment = public_listings.fragment(listing_id)
+    if fragment is None:
+        # Sold/inactive listings are not in the view; project this one now
+        fragment = encode_json(public_listing(listing, sellers.get(listing.get('seller_id'))))
+    return app.response_class(fragment, mimetype='application/json')
+
+@app.route('/img/<listing_id>/<size>')
+def listing_image(listing_id, size):
+    """Serve a listing's card image from the local image cache
+    
+    Until the image has been downloaded this redirects to the upstream URL
+    (only if it is on one of the image sources) and queues the download, so
+    the next view is served locally. Listings carry an image_version; with
+    ?v=<image_version> the cached image is served as immutable, since a
+    changed image gets a new version. Without it (or with an outdated one)
+    browsers revalidate with the ETag (the image digest).
+    """
+    if size not in IMAGE_SIZES:
+        return jsonify({'error': 'Unknown image size'}), 404
+    with state_lock:
+        refresh_state()
+        listing = listing_index.get(listing_id)
+        image_url = listing.get('image_url') if listing else None
+        image_small = listing.get('image_small') if listing else None
+        version = image_version(listing) if listing else None
+    if not image_url:
+        return jsonify({'error': 'Image not found'}), 404
     
-    # Add seller info
-    seller = sellers.get(listing.get('seller_id', ''), {})
-    listing['seller_name'] = seller.get('shop_name', 'Unknown Seller')
-    listing['seller_location'] = seller.get('location', '')
+    cached = image_cache.get(image_url, size)
+    if cached is None:
+        image_cache.request(image_url, image_small)
+        # Image URLs are set by sellers; never redirect off the image sources
+        upstream = image_small if size == 'thumb' and image_cache.allowed(image_small) else image_url
+        if not image_cache.allowed(upstream):
+            return jsonify({'error': 'Image not found'}), 404
+        response = redirect(upstream)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
     
-    return jsonify(listing)
+    path, digest, mimetype = cached
+    response = send_file(path, mimetype=mimetype, etag=digest, conditional=True)
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/sellers')
+@with_state_lock
 def get_sellers():
     """List all active sellers"""
     seller_list = []
     for seller_id, s in sellers.items():
-        seller_listings = [l for l in listings if l.get('seller_id') == seller_id and l.get('status') == 'Active']
         seller_list.append({
             'id': seller_id,
             'shop_name': s.get('shop_name'),
             'location': s.get('location', ''),
-            'listing_count': len(seller_listings),
+            'listing_count': listing_index.count(seller_id, 'Active'),
             'joined': s.get('created', '')[:10]
         })
     return jsonify({'sellers': seller_list})
@@ -316,18 +582,20 @@ def get_sellers():
 # ============================================
 
 @app.route('/api/cart')
+@with_state_lock
 def get_cart():
     """Get current cart contents"""
-    cart_id = get_or_create_cart_id()
-    cart = carts.get(cart_id, {'items': []})
+    cart_id, cart = current_cart()
+    cart = cart or {'items': []}
     
     # Enrich cart items with current listing data
     enriched_items = []
     total = 0
     
     for item in cart.get('items', []):
-        listing = next((l for l in listings if l.get('id') == item.get('listing_id')), None)
-        if listing and listing.get('status') == 'Active':
+        # Only active listings are in the public view
+        listing = public_listings.get(item.get('listing_id'))
+        if listing:
             qty = item.get('quantity', 1)
             price = listing.get('price', 0)
             enriched_items.append({
@@ -339,7 +607,7 @@ def get_cart():
                 'quantity': qty,
                 'subtotal': price * qty,
                 'image_url': listing.get('image_url', ''),
-                'seller_name': sellers.get(listing.get('seller_id', ''), {}).get('shop_name', 'Unknown')
+                'seller_name': listing['seller_name']
             })
             total += price * qty
     
@@ -348,13 +616,15 @@ def get_cart():
         'item_count': len(enriched_items),
         'total': round(total, 2)
     }))
-    response.set_cookie('cart_id', cart_id, max_age=7*24*3600, samesite='Lax')
+    if cart_id:
+        set_cart_cookie(response, cart_id)
     return response
 
 @app.route('/api/cart/add', methods=['POST'])
+@with_state_lock
 def add_to_cart():
     """Add item to cart"""
-    cart_id = get_or_create_cart_id()
+    cart_id, cart = current_cart()
     data = request.get_json() or {}
     
     listing_id = data.get('listing_id')
@@ -364,15 +634,15 @@ def add_to_cart():
         return jsonify({'error': 'listing_id required'}), 400
     
     # Verify listing exists and is active
-    listing = next((l for l in listings if l.get('id') == listing_id and l.get('status') == 'Active'), None)
-    if not listing:
+    listing = listing_index.get(listing_id)
+    if not listing or listing.get('status') != 'Active':
         return jsonify({'error': 'Listing not available'}), 404
     
     # Check quantity available
     available = listing.get('quantity', 1)
     
-    # Get or create cart
-    cart = carts.get(cart_id, {'items': []})
+    # New carts are only created here, once there is something to put in them
+    cart = cart or {'items': []}
     
     # Check if already in cart
     existing = next((i for i in cart['items'] if i.get('listing_id') == listing_id), None)
@@ -386,43 +656,65 @@ def add_to_cart():
             return jsonify({'error': f'Only {available} available'}), 400
         cart['items'].append({'listing_id': listing_id, 'quantity': quantity})
     
-    carts[cart_id] = cart
-    save_json(CARTS_FILE, carts)
-    
     response = make_response(jsonify({'success': True, 'message': 'Added to cart'}))
-    response.set_cookie('cart_id', cart_id, max_age=7*24*3600, samesite='Lax')
-    return response
+    return save_cart(response, cart_id, cart)
 
 @app.route('/api/cart/remove', methods=['POST'])
+@with_state_lock
 def remove_from_cart():
     """Remove item from cart"""
-    cart_id = get_or_create_cart_id()
+    cart_id, cart = current_cart()
     data = request.get_json() or {}
     listing_id = data.get('listing_id')
     
-    if cart_id in carts:
-        carts[cart_id]['items'] = [i for i in carts[cart_id].get('items', []) if i.get('listing_id') != listing_id]
-        save_json(CARTS_FILE, carts)
-    
-    return jsonify({'success': True})
+    response = make_response(jsonify({'success': True}))
+    if cart is not None:
+        cart['items'] = [i for i in cart.get('items', []) if i.get('listing_id') != listing_id]
+        save_cart(response, cart_id, cart)
+    return response
 
 @app.route('/api/cart/clear', methods=['POST'])
+@with_state_lock
 def clear_cart():
     """Clear entire cart"""
-    cart_id = get_or_create_cart_id()
-    if cart_id in carts:
-        carts[cart_id]['items'] = []
-        save_json(CARTS_FILE, carts)
-    return jsonify({'success': True})
+    cart_id, _ = current_cart()
+    if cart_id:
+        cart_store.delete(cart_id)
+    return clear_cart_cookie(make_response(jsonify({'success': True})))
+
+def new_order_id():
+    """Order id not used by any existing order"""
+    while True:
+        order_id = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+        if order_id not in order_index:
+            return order_id
+
+def checkout_response(created_orders, replayed=False):
+    response = jsonify({
+        'success': True,
+        'order_ids': [o['id'] for o in created_orders],
+        'message': 'Order placed! Seller will contact you with payment details.'
+    })
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
 
 @app.route('/api/checkout', methods=['POST'])
+@with_state_lock
 def checkout():
-    """Create order from cart"""
-    cart_id = get_or_create_cart_id()
-    cart = carts.get(cart_id, {'items': []})
-    
-    if not cart.get('items'):
-        return jsonify({'error': 'Cart is empty'}), 400
+    """Create orders from the cart
+
+    state_lock makes this the only writer while it runs, so stock is checked
+    and taken in one step: either every item is still available and the
+    orders, stock changes and the cart's removal are persisted in one
+    transaction, or nothing is written. A retry sending the same
+    Idempotency-Key header gets the orders of the first attempt back
+    instead of new ones. A cart in the signed cookie needs no storage: the
+    orders are created straight from it and the cookie is cleared.
+    """
+    cart_id, cart = current_cart()
+    cart = cart or {'items': []}
+    idempotency_key = request.headers.get('Idempotency-Key', '').strip() or None
     
     data = request.get_json() or {}
     buyer_email = data.get('email')
@@ -432,29 +724,59 @@ def checkout():
     if not buyer_email or not buyer_name:
         return jsonify({'error': 'Name and email required'}), 400
     
-    # Group items by seller
-    seller_orders = {}
+    previous = order_index.for_idempotency_key(idempotency_key)
+    if previous:
+        if any(o.get('buyer_email') != buyer_email for o in previous):
+            return jsonify({'error': 'Idempotency-Key was already used for a different checkout'}), 422
+        return clear_cart_cookie(checkout_response(previous, replayed=True))
+    
+    if not cart.get('items'):
+        return jsonify({'error': 'Cart is empty'}), 400
+    
+    # Check every item against current stock before writing anything
+    requested = {}
     for item in cart['items']:
-        listing = next((l for l in listings if l.get('id') == item['listing_id']), None)
-        if listing:
-            seller_id = listing.get('seller_id')
-            if seller_id not in seller_orders:
-                seller_orders[seller_id] = []
-            seller_orders[seller_id].append({
-                'listing_id': listing['id'],
-                'card_name': listing.get('card_name'),
-                'set_code': listing.get('set_code'),
-                'condition': listing.get('condition'),
-                'price': listing.get('price'),
-                'quantity': item.get('quantity', 1)
+        quantity = item.get('quantity', 1)
+        if not isinstance(quantity, int) or quantity < 1:
+            return jsonify({'error': f"Invalid quantity for {item.get('listing_id')}"}), 400
+        requested[item['listing_id']] = requested.get(item['listing_id'], 0) + quantity
+    
+    unavailable = []
+    for listing_id, quantity in requested.items():
+        listing = listing_index.get(listing_id)
+        available = listing.get('quantity', 1) if listing and listing.get('status') == 'Active' else 0
+        if quantity > available:
+            unavailable.append({
+                'listing_id': listing_id,
+                'card_name': listing.get('card_name') if listing else None,
+                'requested': quantity,
+                'available': max(available, 0)
             })
+    if unavailable:
+        return jsonify({'error': 'Some items are no longer available', 'unavailable': unavailable}), 409
     
-    # Create order for each seller
-    created_orders = []
+    # Group items by seller
+    seller_orders = {}
+    for listing_id, quantity in requested.items():
+        listing = listing_index.get(listing_id)
+        seller_orders.setdefault(listing.get('seller_id'), []).append({
+            'listing_id': listing['id'],
+            'card_name': listing.get('card_name'),
+            'set_code': listing.get('set_code'),
+            'condition': listing.get('condition'),
+            'price': listing.get('price'),
+            'quantity': quantity
+        })
+    
+    # Build the new records first and persist them together; orders and
+    # listings in memory are only updated once the transaction has committed
+    now = datetime.now().isoformat()
+    new_orders = []
+    stock = {}
     for seller_id, items in seller_orders.items():
         order_total = sum(i['price'] * i['quantity'] for i in items)
-        order = {
-            'id': f"ORD-{uuid.uuid4().hex[:8].upper()}",
+        new_orders.append({
+            'id': new_order_id(),
             'seller_id': seller_id,
             'buyer_name': buyer_name,
             'buyer_email': buyer_email,
@@ -462,38 +784,38 @@ def checkout():
             'items': items,
             'total': round(order_total, 2),
             'status': 'pending',
-            'created': datetime.now().isoformat(),
-            'updated': datetime.now().isoformat()
-        }
-        orders.append(order)
-        created_orders.append(order['id'])
-        
+            'idempotency_key': idempotency_key,
+            'created': now,
+            'updated': now
+        })
         # Mark listings as reserved/sold
         for item in items:
-            for listing in listings:
-                if listing['id'] == item['listing_id']:
-                    listing['quantity'] = listing.get('quantity', 1) - item['quantity']
-                    if listing['quantity'] <= 0:
-                        listing['status'] = 'Sold'
+            listing = listing_index.get(item['listing_id'])
+            remaining = listing.get('quantity', 1) - item['quantity']
+            stock[listing['id']] = {'quantity': remaining, 'status': 'Sold' if remaining <= 0 else listing.get('status')}
     
-    save_json(ORDERS_FILE, orders)
-    save_json(LISTINGS_FILE, listings)
+    with storage.transaction():
+        for order in new_orders:
+            storage.put('orders', order)
+        for listing_id, changes in stock.items():
+            storage.put('listings', dict(listing_index.get(listing_id), **changes))
+        cart_store.delete(cart_id)
     
-    # Clear cart
-    carts[cart_id]['items'] = []
-    save_json(CARTS_FILE, carts)
+    for order in new_orders:
+        order_index.reindex(order)
+    for listing_id, changes in stock.items():
+        listing = listing_index.get(listing_id)
+        listing.update(changes)
+        listing_index.reindex(listing)
     
-    return jsonify({
-        'success': True,
-        'order_ids': created_orders,
-        'message': 'Order placed! Seller will contact you with payment details.'
-    })
+    return clear_cart_cookie(checkout_response(new_orders))
 
 # ============================================
 # SELLER ENDPOINTS
 # ============================================
 
 @app.route('/api/seller/register', methods=['POST'])
+@with_state_lock
 def register_seller():
     """Register a new seller account"""
     data = request.get_json() or {}
@@ -518,11 +840,34 @@ def register_seller():
         'shop_name': shop_name,
         'email': email,
         'location': location,
-        'api_key': api_key,
+        'api_key_hash': hash_api_key(api_key),
         'created': datetime.now().isoformat(),
         'status': 'active'
     }
-    save_json(SELLERS_FILE, sellers)
+    api_key_index.reindex(seller_id, sellers[seller_id])
+    public_listings.update_seller(seller_id)
+    storage.put('sellers', sellers[seller_id], seller_id)
+    
+    return jsonify({
+        'success': True,
+        'seller_id': seller_id,
+        'api_key': api_key,
+        'message': 'Store this API key securely - it will not be shown again!'
+    })
+
+@app.route('/api/seller/key/rotate', methods=['POST'])
+@with_state_lock
+@require_api_key
+def rotate_api_key():
+    """Replace the seller's API key (the old key stops working immediately)"""
+    seller_id = request.seller['id']
+    api_key = f"nxs_{secrets.token_hex(24)}"
+    
+    seller = sellers[seller_id]
+    seller.pop('api_key', None)
+    seller['api_key_hash'] = hash_api_key(api_key)
+    api_key_index.reindex(seller_id, seller)
+    storage.put('sellers', seller, seller_id)
     
     return jsonify({
         'success': True,
@@ -531,83 +876,374 @@ def register_seller():
         'message': 'Store this API key securely - it will not be shown again!'
     })
 
+def new_listing_id():
+    """Unused listing ID (8 hex digits collide within tens of thousands of listings)"""
+    while True:
+        listing_id = f"LST-{uuid.uuid4().hex[:8].upper()}"
+        if listing_id not in listing_index:
+            return listing_id
+
+# Listing fields the indexes read as text
+SYNC_TEXT_FIELDS = ('card_name', 'condition', 'status', 'type_line', 'oracle_text')
+
+def check_synced_listing(incoming):
+    """Reject a synced listing the indexes can't file (ValueError); ids are
+    coerced to strings"""
+    if not isinstance(incoming, dict):
+        raise ValueError('Listing must be an object')
+    listing_id = incoming.get('id')
+    if listing_id is not None:
+        if isinstance(listing_id, bool) or not isinstance(listing_id, (str, int)):
+            raise ValueError('Invalid listing id')
+        incoming['id'] = str(listing_id)
+    for field in SYNC_TEXT_FIELDS:
+        if incoming.get(field) is not None and not isinstance(incoming[field], str):
+            raise ValueError(f'Invalid {field}')
+    colors = incoming.get('colors')
+    if colors is not None and not isinstance(colors, str) and not (
+            isinstance(colors, list) and all(isinstance(c, str) for c in colors)):
+        raise ValueError('Invalid colors')
+
+def apply_synced_listing(seller_id, incoming, synced_at, skip_unchanged=False):
+    """Add or update one listing from a seller sync; returns 'added' or
+    'updated' ('unchanged' with skip_unchanged and a matching content hash)
+    
+    Raises ValueError, before changing anything, for a listing that fails
+    check_synced_listing(). Call inside storage.transaction() while holding
+    state_lock.
+    """
+    check_synced_listing(incoming)
+    # Listing order is the server's: a new listing is listed now, an
+    # existing one keeps its place
+    incoming.pop('listed_at', None)
+    incoming['content_hash'] = content_hash(incoming)
+    incoming['seller_id'] = seller_id
+    incoming['synced_at'] = synced_at
+    
+    # Check if listing already exists (by ID or by card+condition+seller)
+    existing = listing_index.get(incoming.get('id'))
+    if existing is not None and existing.get('seller_id') != seller_id:
+        # Another seller's listing id; never overwrite it
+        incoming.pop('id')
+        existing = None
+    if not existing:
+        existing = listing_index.find_card(seller_id, incoming.get('card_name'), incoming.get('condition'))
+    
+    # Generate listing ID if not present (keep the matched listing's ID)
+    if not incoming.get('id'):
+        incoming['id'] = existing['id'] if existing else new_listing_id()
+    elif existing and existing['id'] != incoming['id']:
+        storage.delete('listings', existing['id'])
+        listing_index.remove(existing['id'])
+    
+    if (skip_unchanged and existing and existing['id'] == incoming['id']
+            and existing.get('content_hash') == incoming['content_hash']):
+        return 'unchanged'
+    
+    if existing:
+        # Update existing
+        existing.update(incoming)
+        enrich_listing(existing, save=False)
+        listing_index.reindex(existing)
+        storage.put('listings', existing)
+        return 'updated'
+    
+    # Add new
+    incoming['listed_at'] = datetime.now().isoformat(timespec='microseconds')
+    enrich_listing(incoming, save=False)
+    listing_index.reindex(incoming)
+    storage.put('listings', incoming)
+    return 'added'
+
+def remove_seller_listings(seller_id, keep=None):
+    """Delete a seller's listings (except ids in keep); returns how many
+    
+    Call inside storage.transaction() while holding state_lock.
+    """
+    removed = 0
+    for l in listing_index.for_seller(seller_id):
+        if keep is None or l['id'] not in keep:
+            storage.delete('listings', l['id'])
+            listing_index.remove(l['id'])
+            removed += 1
+    return removed
+
+def bump_sync_version(seller_id):
+    """Advance a seller's sync version after their listings changed"""
+    seller = sellers[seller_id]
+    seller['sync_version'] = seller.get('sync_version', 0) + 1
+    storage.put('sellers', seller, seller_id)
+    return seller['sync_version']
+
+def run_sync(seller_id, items, mode='merge', counts=None, progress=None):
+    """Apply synced listings from an iterable, SYNC_BATCH_SIZE per transaction
+    
+    With mode='replace' the seller's listings missing from items are removed
+    once all of them have been applied. counts is updated as batches are
+    committed (job progress) and returned; progress() is called after each.
+    
+    Invalid listings are counted as failed and skipped. Any other error
+    rolls back the current batch, reloads memory from storage and is raised.
+    
+    The seller's sync version is bumped if any listing was added, updated
+    or removed, including when an error stops the sync after earlier
+    batches were committed.
+    """
+    if counts is None:
+        counts = {}
+    for key in ('processed', 'added', 'updated', 'removed', 'skipped', 'failed'):
+        counts.setdefault(key, 0)
+    synced_at = datetime.now().isoformat()
+    seen = set()
+    # Listings added or updated by committed batches
+    committed = 0
+    finished = False
+    
+    try:
+        for batch in batched(items, SYNC_BATCH_SIZE):
+            try:
+                with state_lock, storage.transaction():
+                    for incoming in batch:
+                        counts['processed'] += 1
+                        if not isinstance(incoming, dict):
+                            counts['skipped'] += 1
+                            continue
+                        try:
+                            counts[apply_synced_listing(seller_id, incoming, synced_at)] += 1
+                            seen.add(incoming['id'])
+                        except ValueError as e:
+                            print(f"Sync error for {incoming.get('card_name')}: {e}")
+                            counts['failed'] += 1
+            except Exception:
+                # The listing may have been half applied to the indexes; the
+                # batch's writes were dropped, so start again from storage
+                reload_state()
+                raise
+            committed = counts['added'] + counts['updated']
+            if progress is not None:
+                progress()
+        
+        with state_lock:
+            try:
+                with storage.transaction():
+                    if mode == 'replace':
+                        counts['removed'] = remove_seller_listings(seller_id, keep=seen)
+                    if committed or counts['removed']:
+                        bump_sync_version(seller_id)
+            except Exception:
+                reload_state()
+                raise
+        finished = True
+    finally:
+        if committed and not finished:
+            # Clients comparing versions must see the batches that did commit
+            with state_lock, storage.transaction():
+                bump_sync_version(seller_id)
+    
+    with state_lock:
+        counts['version'] = sellers[seller_id].get('sync_version', 0)
+        counts['total_listings'] = listing_index.count(seller_id)
+    return counts
+
+def start_sync_job(seller_id, items, mode, cleanup=None):
+    """Queue run_sync as a background job; returns the 202 response"""
+    def job_fn(job):
+        try:
+            return run_sync(seller_id, items, mode, job.counts, progress=job.checkpoint)
+        finally:
+            if cleanup is not None:
+                cleanup()
+    
+    job = sync_jobs.submit(seller_id, 'sync', job_fn)
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status,
+                    'status_url': f'/api/seller/sync/{job.id}'}), 202
+
 @app.route('/api/seller/sync', methods=['POST'])
+@with_state_lock
 @require_api_key
 def sync_listings():
-    """Sync listings from V2 desktop app"""
-    global listings
+    """Sync listings from V2 desktop app
     
+    With ?async=1 (or "async": true) the sync runs as a background job and
+    the response carries a job_id to poll at /api/seller/sync/<job_id>.
+    """
     data = request.get_json() or {}
     incoming_listings = data.get('listings', [])
     mode = data.get('mode', 'merge')  # 'merge' or 'replace'
     
     seller_id = request.seller['id']
     
-    if mode == 'replace':
-        # Remove all existing listings from this seller
-        listings = [l for l in listings if l.get('seller_id') != seller_id]
+    if data.get('async') or request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return start_sync_job(seller_id, incoming_listings, mode)
     
-    # Process incoming listings
-    added = 0
-    updated = 0
+    try:
+        for incoming in incoming_listings:
+            check_synced_listing(incoming)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid listing: {e}'}), 400
     
-    for incoming in incoming_listings:
-        # Generate listing ID if not present
-        if not incoming.get('id'):
-            incoming['id'] = f"LST-{uuid.uuid4().hex[:8].upper()}"
-        
-        # Set seller ID
-        incoming['seller_id'] = seller_id
-        incoming['synced_at'] = datetime.now().isoformat()
-        
-        # Enrich with Scryfall image if not provided
-        if not incoming.get('image_url'):
-            enrich_listing(incoming)
-        
-        # Check if listing already exists (by ID or by card+condition+seller)
-        existing = next((l for l in listings if l.get('id') == incoming.get('id') or 
-                        (l.get('card_name') == incoming.get('card_name') and 
-                         l.get('condition') == incoming.get('condition') and
-                         l.get('seller_id') == seller_id)), None)
-        
-        if existing:
-            # Update existing
-            existing.update(incoming)
-            updated += 1
-        else:
-            # Add new
-            listings.append(incoming)
-            added += 1
+    counts = {'added': 0, 'updated': 0, 'removed': 0}
     
-    save_json(LISTINGS_FILE, listings)
+    with storage.transaction():
+        if mode == 'replace':
+            # Remove all existing listings from this seller
+            counts['removed'] = remove_seller_listings(seller_id)
+        
+        # Process incoming listings
+        synced_at = datetime.now().isoformat()
+        for incoming in incoming_listings:
+            counts[apply_synced_listing(seller_id, incoming, synced_at)] += 1
+        if counts['added'] or counts['updated'] or counts['removed']:
+            bump_sync_version(seller_id)
+        version = sellers[seller_id].get('sync_version', 0)
     
     return jsonify({
         'success': True,
-        'added': added,
-        'updated': updated,
-        'total_listings': len([l for l in listings if l.get('seller_id') == seller_id])
+        'added': counts['added'],
+        'updated': counts['updated'],
+        'total_listings': listing_index.count(seller_id),
+        'version': version
     })
 
+@app.route('/api/v2/seller/sync', methods=['POST'])
+@require_api_key
+def sync_listings_stream():
+    """Streaming sync for large inventories
+    
+    The body is NDJSON (Content-Type: application/x-ndjson, one listing per
+    line) or a JSON array of listings, parsed as it is read and applied
+    SYNC_BATCH_SIZE listings per transaction, so memory stays flat and
+    browsing continues between batches. With ?mode=replace the seller's
+    listings missing from the stream are removed once it has been read
+    completely (nothing is removed if the body is invalid).
+    
+    With ?async=1 the body is spooled to a temporary file and applied by a
+    background job; poll /api/seller/sync/<job_id> for progress.
+    """
+    seller_id = request.seller['id']
+    mode = request.args.get('mode', 'merge')
+    
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        spool = tempfile.SpooledTemporaryFile(max_size=SYNC_SPOOL_BYTES)
+        shutil.copyfileobj(request.stream, spool)
+        spool.seek(0)
+        return start_sync_job(seller_id, read_listings(spool, request.content_type), mode, cleanup=spool.close)
+    
+    started = time.time()
+    counts = {}
+    try:
+        run_sync(seller_id, read_listings(request.stream, request.content_type), mode, counts)
+    except ValueError as e:
+        return jsonify(dict(counts, success=False, error=f'Invalid sync body: {e}')), 400
+    
+    return jsonify(dict(counts, success=True, elapsed_ms=round((time.time() - started) * 1000, 1)))
+
+@app.route('/api/seller/sync/<job_id>')
+@require_api_key
+def sync_job_status(job_id):
+    """Progress of a background sync job (processed/added/updated/failed
+    counts and listings per second)"""
+    status = sync_jobs.status(job_id)
+    if status is None or status[0] != request.seller['id']:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status[1])
+
+@app.route('/api/seller/sync/manifest')
+@with_state_lock
+@require_api_key
+def sync_manifest():
+    """Content hash of each of the seller's listings and their sync version
+    
+    Listings synced before hashes were recorded have a null hash, so the
+    client sends them once more.
+    """
+    seller_id = request.seller['id']
+    return jsonify({
+        'version': sellers[seller_id].get('sync_version', 0),
+        'listings': {l['id']: l.get('content_hash') for l in listing_index.for_seller(seller_id)},
+        'total': listing_index.count(seller_id)
+    })
+
+@app.route('/api/seller/sync/delta', methods=['POST'])
+@with_state_lock
+@require_api_key
+def sync_delta():
+    """Apply only what changed since the client's last sync
+    
+    Body: {"base_version": <version from the manifest or last delta>,
+           "upserts": [listing, ...], "deletes": [listing id, ...]}
+    Returns 409 with the current version if base_version is stale; the
+    client should then re-read the manifest. A malformed body is rejected
+    with 400 before anything is checked or applied.
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    upserts = data.get('upserts') or []
+    deletes = data.get('deletes') or []
+    if not isinstance(upserts, list) or not all(isinstance(i, dict) for i in upserts):
+        return jsonify({'error': 'upserts must be a list of listings'}), 400
+    if not isinstance(deletes, list) or not all(isinstance(i, str) for i in deletes):
+        return jsonify({'error': 'deletes must be a list of listing ids'}), 400
+    try:
+        for incoming in upserts:
+            check_synced_listing(incoming)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid listing: {e}'}), 400
+    
+    seller_id = request.seller['id']
+    version = sellers[seller_id].get('sync_version', 0)
+    
+    if data.get('base_version') != version:
+        return jsonify({'error': 'Sync version conflict, fetch the manifest and retry',
+                        'version': version}), 409
+    
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'missing': 0}
+    hashes = {}
+    synced_at = datetime.now().isoformat()
+    
+    with storage.transaction():
+        for incoming in upserts:
+            counts[apply_synced_listing(seller_id, incoming, synced_at, skip_unchanged=True)] += 1
+            hashes[incoming['id']] = incoming['content_hash']
+        
+        for listing_id in deletes:
+            listing = listing_index.get(listing_id)
+            if listing is None or listing.get('seller_id') != seller_id:
+                counts['missing'] += 1
+                continue
+            storage.delete('listings', listing_id)
+            listing_index.remove(listing_id)
+            counts['deleted'] += 1
+        
+        if counts['added'] or counts['updated'] or counts['deleted']:
+            version = bump_sync_version(seller_id)
+    
+    return jsonify(dict(counts, success=True, version=version, hashes=hashes,
+                        total_listings=listing_index.count(seller_id)))
+
 @app.route('/api/seller/listings')
+@with_state_lock
 @require_api_key
 def seller_listings():
     """Get seller's own listings"""
     seller_id = request.seller['id']
-    my_listings = [l for l in listings if l.get('seller_id') == seller_id]
+    my_listings = listing_index.for_seller(seller_id)
     
     return jsonify({
         'listings': my_listings,
         'total': len(my_listings),
-        'active': len([l for l in my_listings if l.get('status') == 'Active']),
-        'sold': len([l for l in my_listings if l.get('status') == 'Sold'])
+        'active': listing_index.count(seller_id, 'Active'),
+        'sold': listing_index.count(seller_id, 'Sold')
     })
 
 @app.route('/api/seller/orders')
+@with_state_lock
 @require_api_key
 def seller_orders():
     """Get seller's incoming orders"""
     seller_id = request.seller['id']
-    my_orders = [o for o in orders if o.get('seller_id') == seller_id]
+    my_orders = order_index.for_seller(seller_id)
     
     # Sort by date descending
     my_orders.sort(key=lambda x: x.get('created', ''), reverse=True)
@@ -615,11 +1251,12 @@ def seller_orders():
     return jsonify({
         'orders': my_orders,
         'total': len(my_orders),
-        'pending': len([o for o in my_orders if o.get('status') == 'pending']),
-        'completed': len([o for o in my_orders if o.get('status') == 'completed'])
+        'pending': order_index.count(seller_id, 'pending'),
+        'completed': order_index.count(seller_id, 'completed')
     })
 
 @app.route('/api/seller/order/<order_id>/update', methods=['POST'])
+@with_state_lock
 @require_api_key
 def update_order(order_id):
     """Update order status"""
@@ -628,8 +1265,8 @@ def update_order(order_id):
     new_status = data.get('status')
     tracking = data.get('tracking')
     
-    order = next((o for o in orders if o.get('id') == order_id and o.get('seller_id') == seller_id), None)
-    if not order:
+    order = order_index.get(order_id)
+    if not order or order.get('seller_id') != seller_id:
         return jsonify({'error': 'Order not found'}), 404
     
     if new_status:
@@ -638,7 +1275,8 @@ def update_order(order_id):
         order['tracking'] = tracking
     order['updated'] = datetime.now().isoformat()
     
-    save_json(ORDERS_FILE, orders)
+    order_index.reindex(order)
+    storage.put('orders', order)
     
     return jsonify({'success': True, 'order': order})
 
@@ -652,15 +1290,13 @@ def legacy_search():
     return get_listings()
 
 @app.route('/analytics/summary')
+@with_state_lock
 def analytics_summary():
     """Collection analytics"""
-    active = [l for l in listings if l.get('status') == 'Active']
-    total_value = sum(l.get('price', 0) * l.get('quantity', 1) for l in active)
-    
     return jsonify({
-        'total_value': round(total_value, 2),
-        'total_listings': len(active),
-        'unique_cards': len(set(l.get('card_name') for l in active)),
+        'total_value': round(listing_index.active_value, 2),
+        'total_listings': len(listing_index.lookup('status', 'Active')),
+        'unique_cards': len(listing_index.active_names),
         'total_sellers': len(sellers)
     })
 
@@ -710,8 +1346,8 @@ if __name__ == '__main__':
     print('Multi-Seller Platform with Cart & Checkout')
     print('=' * 60)
     print(f'Sellers: {len(sellers)}')
-    print(f'Listings: {len(listings)}')
-    print(f'Orders: {len(orders)}')
+    print(f'Listings: {len(listing_index)}')
+    print(f'Orders: {len(order_index)}')
     print('=' * 60)
     
     port = int(os.environ.get('PORT', 5001))
@@ -0,0 +1,684 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Storage Engines
+
+Persistence for the marketplace collections (sellers, listings, orders, carts).
+Every engine loads a collection in the same shape the server has always used
+(dict keyed by id, or list of records carrying an 'id') and then persists
+individual records with put()/delete(), so callers never rewrite a whole
+collection to record one change.
+
+Engines:
+  json    - data/<collection>.json, rewritten on every change (original behaviour);
+            a transaction touching several collections rewrites them one after
+            another, so a crash in between keeps only some of them
+  journal - data/<collection>.json snapshot + append-only data/<collection>.journal,
+            compacted into the snapshot in the background
+  sqlite  - data/marketplace.db in WAL mode, one row per record; the only
+            engine several worker processes can share (see changes())
+
+Usage:
+    python marketplace_storage.py migrate [data_dir] [db_path]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# Collection name -> in-memory shape
+COLLECTIONS = {
+    'sellers': dict,
+    'listings': list,
+    'orders': list,
+    'carts': dict,
+}
+
+def load_json(filepath, default=None):
+    """Load JSON file with default fallback"""
+    if default is None:
+        default = {}
+    if filepath.exists():
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except:
+            pass
+    return default
+
+def save_json(filepath, data):
+    """Save data to JSON file"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, default=str)
+
+def write_json_tmp(filepath, data):
+    """Write JSON to a temp file next to filepath (<name>.<pid>.<thread>.tmp)
+    and return its path, ready to be renamed over filepath"""
+    tmp = filepath.with_name(f'{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+def write_json_atomic(filepath, data):
+    """Write JSON to a temp file and rename it over filepath"""
+    os.replace(write_json_tmp(filepath, data), filepath)
+
+def record_key(collection, key, record):
+    """Key used to store a record ('id' field for list collections)"""
+    if key is None:
+        key = record.get('id')
+    if key is None:
+        raise ValueError(f'{collection} record has no id')
+    return str(key)
+
+def to_shape(collection, records):
+    """Convert a key -> record mapping into the collection's in-memory shape"""
+    if COLLECTIONS[collection] is list:
+        return list(records.values())
+    return dict(records)
+
+def from_shape(collection, data):
+    """Convert a collection in its in-memory shape into key -> record"""
+    if COLLECTIONS[collection] is list:
+        return {record_key(collection, None, r): r for r in data}
+    return {str(k): v for k, v in data.items()}
+
+# ============================================
+# ENGINE INTERFACE
+# ============================================
+
+class StorageEngine:
+    """Base class for marketplace storage engines"""
+
+    name = 'base'
+
+    # Called once a write transaction holds the write lock, before any write
+    # (only by engines that several processes can share)
+    before_write = None
+
+    def load(self, collection):
+        """Load a whole collection in its in-memory shape"""
+        raise NotImplementedError
+
+    def put(self, collection, record, key=None):
+        """Insert or replace a single record"""
+        raise NotImplementedError
+
+    def delete(self, collection, key):
+        """Delete a single record (no-op if missing)"""
+        raise NotImplementedError
+
+    def replace(self, collection, data):
+        """Replace a whole collection"""
+        raise NotImplementedError
+
+    def put_many(self, collection, records):
+        """Insert or replace several records in one transaction"""
+        with self.transaction():
+            for record in records:
+                self.put(collection, record)
+
+    @contextmanager
+    def transaction(self):
+        """Group writes so they are persisted together"""
+        yield
+
+    def changes(self):
+        """Records other processes changed since the last call
+
+        Returns {collection: {key: record, or None if deleted}}, or None
+        when changes were missed and every collection must be reloaded.
+        Engines owned by a single process never report any.
+        """
+        return {}
+
+    def close(self):
+        pass
+
+# ============================================
+# JSON FILE ENGINE
+# ============================================
+
+class JSONStorage(StorageEngine):
+    """One JSON file per collection, rewritten whenever it changes
+
+    A transaction's files are written one at a time when it ends, so it is
+    not crash-safe across collections; checkouts need the journal or sqlite
+    engine to be persisted all or nothing. A transaction that raises writes
+    nothing: every collection is read from its file again instead.
+    """
+
+    name = 'json'
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._records = {}
+        self._dirty = set()
+        self._depth = 0
+        self._lock = threading.RLock()
+
+    def path(self, collection):
+        return self.data_dir / f'{collection}.json'
+
+    def _collection(self, collection):
+        if collection not in self._records:
+            default = COLLECTIONS[collection]()
+            self._records[collection] = from_shape(collection, load_json(self.path(collection), default))
+        return self._records[collection]
+
+    def _changed(self, collection):
+        self._dirty.add(collection)
+        if self._depth == 0:
+            self._flush()
+
+    def _flush(self):
+        for collection in sorted(self._dirty):
+            save_json(self.path(collection), to_shape(collection, self._records[collection]))
+        self._dirty.clear()
+
+    def load(self, collection):
+        with self._lock:
+            return to_shape(collection, self._collection(collection))
+
+    def put(self, collection, record, key=None):
+        with self._lock:
+            self._collection(collection)[record_key(collection, key, record)] = record
+            self._changed(collection)
+
+    def delete(self, collection, key):
+        with self._lock:
+            if self._collection(collection).pop(str(key), None) is not None:
+                self._changed(collection)
+
+    def replace(self, collection, data):
+        with self._lock:
+            self._records[collection] = from_shape(collection, data)
+            self._changed(collection)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._depth += 1
+            try:
+                yield
+            except:
+                self._depth -= 1
+                if self._depth == 0:
+                    # Records are shared with the caller and may have been
+                    # changed in place without a put(), so drop them all
+                    self._records.clear()
+                    self._dirty.clear()
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush()
+
+# ============================================
+# JOURNAL ENGINE
+# ============================================
+
+# Compact a collection's journal once it grows past this many bytes
+JOURNAL_MAX_BYTES = int(os.environ.get('NEXUS_JOURNAL_MAX_BYTES', 4 * 1024 * 1024))
+
+def replay_journal(path, records):
+    """Apply journal entries from path to a key -> record mapping"""
+    if not path.exists():
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Torn write from a crash: only ever the last line
+                continue
+            ops = entry['ops'] if entry.get('op') == 'batch' else [entry]
+            for op in ops:
+                if op['op'] == 'put':
+                    records[op['key']] = op['data']
+                elif op['op'] == 'del':
+                    records.pop(op['key'], None)
+    return records
+
+def truncate_torn_tail(path):
+    """Drop a partially written last line so new entries start on a fresh line"""
+    if not path.exists():
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+class JournalStorage(StorageEngine):
+    """JSON snapshot per collection plus an append-only journal of changes
+
+    Each put/delete appends one line to data/<collection>.journal, so a write
+    costs the size of the record rather than the whole collection. Once a
+    journal passes JOURNAL_MAX_BYTES it is rotated to <collection>.journal.old
+    and a background thread folds it into data/<collection>.json, which is
+    replaced atomically.
+
+    A transaction touching several collections is first written whole to
+    data/transaction.journal and only then to each collection's journal; if
+    the process dies in between, the next start re-applies it from there.
+    Snapshot temp files left by an interrupted compaction are removed then
+    too.
+    """
+
+    name = 'journal'
+
+    def __init__(self, data_dir, max_bytes=None, fsync=None):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = JOURNAL_MAX_BYTES if max_bytes is None else max_bytes
+        if fsync is None:
+            fsync = os.environ.get('NEXUS_JOURNAL_FSYNC', '').lower() in ('1', 'true', 'yes')
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._compacting = {c: threading.Lock() for c in COLLECTIONS}
+        self._files = {}
+        self._pending = None
+        self._depth = 0
+        self._txn_file = None
+        self._recover()
+        self._remove_temp_files()
+
+    def snapshot_path(self, collection):
+        return self.data_dir / f'{collection}.json'
+
+    def journal_path(self, collection, old=False):
+        return self.data_dir / (f'{collection}.journal.old' if old else f'{collection}.journal')
+
+    def txn_path(self):
+        return self.data_dir / 'transaction.journal'
+
+    def _recover(self):
+        """Finish a multi-collection transaction interrupted by a crash"""
+        path = self.txn_path()
+        if not path.exists():
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data.endswith(b'\n'):
+            # Complete record: puts and deletes are idempotent, so applying
+            # parts that already reached the collection journals is harmless
+            for collection, entry in json.loads(data)['collections'].items():
+                self._write(collection, entry)
+        path.unlink()
+
+    def _remove_temp_files(self):
+        """Delete snapshot temp files of writes that never got renamed"""
+        for collection in COLLECTIONS:
+            for tmp in self.data_dir.glob(f'{self.snapshot_path(collection).name}.*.tmp'):
+                tmp.unlink(missing_ok=True)
+
+    def _file(self, collection):
+        if collection not in self._files:
+            path = self.journal_path(collection)
+            truncate_torn_tail(path)
+            self._files[collection] = open(path, 'ab')
+        return self._files[collection]
+
+    def _read(self, collection):
+        default = COLLECTIONS[collection]()
+        records = from_shape(collection, load_json(self.snapshot_path(collection), default))
+        replay_journal(self.journal_path(collection, old=True), records)
+        replay_journal(self.journal_path(collection), records)
+        return records
+
+    def load(self, collection):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        with self._lock:
+            records = self._read(collection)
+            self._file(collection)
+        if self.journal_path(collection, old=True).exists():
+            # A previous compaction was interrupted; finish it
+            self._start_compaction(collection)
+        return to_shape(collection, records)
+
+    def _append(self, collection, op):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.setdefault(collection, []).append(op)
+                return
+            self._write(collection, op)
+
+    def _write(self, collection, entry):
+        f = self._file(collection)
+        f.write(json.dumps(entry, default=str).encode('utf-8') + b'\n')
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        if f.tell() > self.max_bytes:
+            self._rotate(collection)
+
+    def put(self, collection, record, key=None):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        self._append(collection, {'op': 'put', 'key': record_key(collection, key, record), 'data': record})
+
+    def delete(self, collection, key):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        self._append(collection, {'op': 'del', 'key': str(key)})
+
+    def replace(self, collection, data):
+        with self._compacting[collection], self._lock:
+            write_json_atomic(self.snapshot_path(collection), to_shape(collection, from_shape(collection, data)))
+            if collection in self._files:
+                self._files.pop(collection).close()
+            self.journal_path(collection).unlink(missing_ok=True)
+            self.journal_path(collection, old=True).unlink(missing_ok=True)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            outer = self._pending is None
+            if outer:
+                self._pending = {}
+            try:
+                yield
+            except:
+                if outer:
+                    self._pending = None
+                raise
+            if outer:
+                pending, self._pending = self._pending, None
+                # One line per collection, so each collection's part of the
+                # transaction is applied whole or not at all
+                entries = {c: ops[0] if len(ops) == 1 else {'op': 'batch', 'ops': ops}
+                           for c, ops in pending.items()}
+                if len(entries) > 1:
+                    self._begin_txn(entries)
+                for collection, entry in entries.items():
+                    self._write(collection, entry)
+                if len(entries) > 1:
+                    self._end_txn()
+
+    def _begin_txn(self, entries):
+        """Record a multi-collection transaction before applying it"""
+        if self._txn_file is None:
+            self._txn_file = open(self.txn_path(), 'wb')
+        f = self._txn_file
+        f.write(json.dumps({'op': 'txn', 'collections': entries}, default=str).encode('utf-8') + b'\n')
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _end_txn(self):
+        f = self._txn_file
+        f.seek(0)
+        f.truncate()
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    # --- compaction ---
+
+    def _rotate(self, collection):
+        """Move the active journal aside and start folding it into the snapshot"""
+        old = self.journal_path(collection, old=True)
+        if old.exists():
+            # Previous compaction still running; keep appending for now
+            return
+        self._files.pop(collection).close()
+        os.replace(self.journal_path(collection), old)
+        self._start_compaction(collection)
+
+    def _start_compaction(self, collection):
+        threading.Thread(target=self.compact, args=(collection,), daemon=True,
+                         name=f'journal-compact-{collection}').start()
+
+    def compact(self, collection):
+        """Fold <collection>.journal.old into the snapshot"""
+        with self._compacting[collection]:
+            old = self.journal_path(collection, old=True)
+            if not old.exists():
+                return
+            default = COLLECTIONS[collection]()
+            records = from_shape(collection, load_json(self.snapshot_path(collection), default))
+            replay_journal(old, records)
+            tmp = write_json_tmp(self.snapshot_path(collection), to_shape(collection, records))
+            # load() reads the snapshot and both journals under the lock, so
+            # it sees either the old snapshot with the old journal or the new
+            # snapshot without it, never a mix
+            with self._lock:
+                os.replace(tmp, self.snapshot_path(collection))
+                old.unlink(missing_ok=True)
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+            if self._txn_file is not None:
+                self._txn_file.close()
+                self._txn_file = None
+                self.txn_path().unlink(missing_ok=True)
+
+# ============================================
+# SQLITE ENGINE
+# ============================================
+
+# Rows kept in the SQLite change log; a process further behind reloads everything
+CHANGES_KEEP = int(os.environ.get('NEXUS_CHANGES_KEEP', 100000))
+
+class SQLiteStorage(StorageEngine):
+    """SQLite database in WAL mode, one row per record
+
+    Every put/delete also appends (collection, key) to a `changes` table in
+    the same transaction, so processes sharing the database (gunicorn
+    workers) can pick up each other's writes with changes(). Write
+    transactions start with BEGIN IMMEDIATE, taking the database write lock
+    up front, and call before_write() (if set) once they hold it, so a
+    process can catch up before it decides what to write.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=30000')
+        for collection in COLLECTIONS:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {collection} (key TEXT PRIMARY KEY, data TEXT NOT NULL)'
+            )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'collection TEXT NOT NULL, key TEXT NOT NULL)'
+        )
+        # Last change this process has seen (its own writes included)
+        self._seq = self._last_seq()
+        self._data_version = None
+        self._logged = 0
+
+    def _last_seq(self):
+        return self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
+    def _log(self, collection, key):
+        self._conn.execute('INSERT INTO changes (collection, key) VALUES (?, ?)', (collection, key))
+        self._logged += 1
+
+    def is_empty(self):
+        with self._lock:
+            for collection in COLLECTIONS:
+                if self._conn.execute(f'SELECT 1 FROM {collection} LIMIT 1').fetchone():
+                    return False
+            return True
+
+    def load(self, collection):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        with self._lock:
+            rows = self._conn.execute(f'SELECT key, data FROM {collection} ORDER BY rowid').fetchall()
+        return to_shape(collection, {key: json.loads(data) for key, data in rows})
+
+    def put(self, collection, record, key=None):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        key = record_key(collection, key, record)
+        with self.transaction():
+            self._conn.execute(
+                f'INSERT INTO {collection} (key, data) VALUES (?, ?) '
+                f'ON CONFLICT(key) DO UPDATE SET data = excluded.data',
+                (key, json.dumps(record, default=str))
+            )
+            self._log(collection, key)
+
+    def delete(self, collection, key):
+        if collection not in COLLECTIONS:
+            raise KeyError(collection)
+        with self.transaction():
+            if self._conn.execute(f'DELETE FROM {collection} WHERE key = ?', (str(key),)).rowcount:
+                self._log(collection, str(key))
+
+    def replace(self, collection, data):
+        with self.transaction():
+            for (key,) in self._conn.execute(f'SELECT key FROM {collection}').fetchall():
+                self._log(collection, key)
+            self._conn.execute(f'DELETE FROM {collection}')
+            for key, record in from_shape(collection, data).items():
+                self.put(collection, record, key)
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute('BEGIN IMMEDIATE')
+                self._logged = 0
+            self._depth += 1
+            try:
+                if self._depth == 1 and self.before_write is not None:
+                    self.before_write()
+                yield
+            except:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute('ROLLBACK')
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._commit()
+
+    def _commit(self):
+        if not self._logged:
+            self._conn.execute('COMMIT')
+            return
+        last = self._last_seq()
+        # Trim the log about once every thousand changes
+        if last > CHANGES_KEEP and last % 1000 < self._logged:
+            self._conn.execute('DELETE FROM changes WHERE seq <= ?', (last - CHANGES_KEEP,))
+        self._conn.execute('COMMIT')
+        if last - self._logged == self._seq:
+            # Nothing from other processes was skipped: our own writes need
+            # not be read back
+            self._seq = last
+
+    def changes(self):
+        with self._lock:
+            # data_version only moves when another connection commits
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if version == self._data_version:
+                return {}
+            self._data_version = version
+            first = self._conn.execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+            if first is not None and first > self._seq + 1:
+                # The log was pruned past what we have seen
+                self._seq = self._last_seq()
+                return None
+            rows = self._conn.execute('SELECT seq, collection, key FROM changes WHERE seq > ? ORDER BY seq',
+                                      (self._seq,)).fetchall()
+            if not rows:
+                return {}
+            changed = {}
+            for _, collection, key in rows:
+                changed.setdefault(collection, {})[key] = None
+            for collection, records in changed.items():
+                keys = list(records)
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    marks = ','.join('?' * len(chunk))
+                    for key, data in self._conn.execute(
+                            f'SELECT key, data FROM {collection} WHERE key IN ({marks})', chunk):
+                        records[key] = json.loads(data)
+            self._seq = rows[-1][0]
+            return changed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# ============================================
+# FACTORY & MIGRATION
+# ============================================
+
+def migrate_json_to_sqlite(data_dir, db_path):
+    """Import data/<collection>.json files into a SQLite database"""
+    source = JSONStorage(data_dir)
+    target = db_path if isinstance(db_path, SQLiteStorage) else SQLiteStorage(db_path)
+    counts = {}
+    with target.transaction():
+        for collection in COLLECTIONS:
+            data = source.load(collection)
+            target.replace(collection, data)
+            counts[collection] = len(data)
+    return counts
+
+def open_storage(engine, data_dir, db_path=None):
+    """Open the storage engine named by NEXUS_STORAGE ('json', 'journal' or 'sqlite')"""
+    data_dir = Path(data_dir)
+    engine = (engine or 'json').lower()
+    if engine == 'json':
+        return JSONStorage(data_dir)
+    if engine == 'journal':
+        return JournalStorage(data_dir)
+    if engine == 'sqlite':
+        db_path = Path(db_path or data_dir / 'marketplace.db')
+        storage = SQLiteStorage(db_path)
+        if storage.is_empty():
+            # First start on SQLite: import whatever the JSON files hold
+            counts = migrate_json_to_sqlite(data_dir, storage)
+            if any(counts.values()):
+                print(f'Imported JSON data into {db_path}: {counts}')
+        return storage
+    raise ValueError(f'Unknown storage engine: {engine}')
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print(__doc__)
+        sys.exit(1)
+    src = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(__file__).parent / 'data'
+    dst = Path(sys.argv[3]) if len(sys.argv) > 3 else src / 'marketplace.db'
+    counts = migrate_json_to_sqlite(src, dst)
+    for collection, count in counts.items():
+        print(f'{collection}: {count} records')
+    print(f'Migrated to {dst}')
@@ -0,0 +1,77 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+"""
+NEXUS Marketplace Sync Streams
+
+Incremental parsing for the v2 seller sync endpoint. The request body is
+read as it arrives, one listing at a time, so a sync of tens of thousands
+of listings never has to be held in memory as a whole:
+
+  application/x-ndjson (or .jsonl)  one listing object per line
+  application/json                  a top-level array of listing objects
+
+Delta sync: every synced listing stores content_hash(), a digest of the
+fields the seller sent, and each seller has a sync_version bumped on every
+change. A client fetches the manifest (id -> hash), sends only listings
+whose hash differs plus tombstones for deleted ids, and gets the new
+version back.
+"""
+
+import hashlib
+import io
+import json
+from itertools import islice
+
+from marketplace_catalog import iter_json_array
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+# Fields the server sets on a listing, left out of its content hash
+SERVER_FIELDS = frozenset(['id', 'seller_id', 'synced_at', 'listed_at', 'content_hash'])
+
+def content_hash(listing):
+    """sha256 of a listing's seller-supplied fields (canonical JSON, sorted keys)"""
+    content = {k: v for k, v in listing.items() if k not in SERVER_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def is_ndjson(content_type):
+    return (content_type or '').split(';')[0].strip().lower() in NDJSON_TYPES
+
+def read_listings(stream, content_type):
+    """Yield listings from a binary request stream; raises ValueError on bad input"""
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    if not is_ndjson(content_type):
+        yield from iter_json_array(text)
+        return
+    for number, line in enumerate(text, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f'line {number}: {e}')
+
+def batched(items, size):
+    """Lists of up to size items"""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,204 @@
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEXUS: Universal Collectibles Recognition and Management System
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Copyright (c) 2025 Kevin Caracozza. All Rights Reserved.
+#
+# PATENT PENDING - U.S. Provisional Application Filed November 27, 2025
+# Application: 35 U.S.C. § 111(b)
+# Classification: G06V 10/00, G06V 30/19, G06N 3/08, G06Q 30/02, H04N 23/00
+#
+# This software is proprietary and confidential. Unauthorized copying,
+# modification, distribution, or use is strictly prohibited.
+#
+# See LICENSE file for full terms.
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+"""
+NEXUS Marketplace Public Listing View
+
+What the public endpoints serve for each active listing: the stored
+listing with its seller's name and location joined in and internal fields
+left out. Projections are built when a listing or seller changes (the
+listing index calls update()/remove()), so a read neither joins nor
+touches the stored records. A projection is never modified once built; a
+change replaces it.
+
+Each projection's JSON encoding is cached as bytes the first time it is
+served and dropped when the projection is replaced, so list responses are
+assembled by joining fragments rather than re-encoding every listing.
+orjson is used for encoding when installed.
+
+Benchmark (fragments vs jsonify for a page of synthetic listings):
+    python marketplace_views.py bench [listings] [page_size] [rounds]
+"""
+
+import hashlib
+import json
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sync bookkeeping and the seller's own inventory location (NEXUS desktop
+# box / call number) are not shown to buyers
+INTERNAL_FIELDS = frozenset(['content_hash', 'synced_at', 'box', 'box_id', 'call_number'])
+
+def encode_json(obj):
+    """Compact JSON bytes with sorted keys, the same shape jsonify produces"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the json module handles those
+            pass
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+def image_version(listing):
+    """Short digest of a listing's image URLs, or None without an image
+    
+    It goes into /img URLs as ?v=, so a changed image gets a new URL and
+    responses for the current one can be cached indefinitely.
+    """
+    if not listing.get('image_url'):
+        return None
+    urls = f"{listing['image_url']}\n{listing.get('image_small') or ''}"
+    return hashlib.sha256(urls.encode('utf-8')).hexdigest()[:16]
+
+def public_listing(listing, seller):
+    """Public projection of a listing (seller may be None)"""
+    view = {k: v for k, v in listing.items() if k not in INTERNAL_FIELDS}
+    seller = seller or {}
+    view['seller_name'] = seller.get('shop_name', 'Unknown Seller')
+    view['seller_location'] = seller.get('location', '')
+    version = image_version(listing)
+    if version is not None:
+        view['image_version'] = version
+    return view
+
+class PublicListingView:
+    """listing id -> public projection, for active listings"""
+
+    def __init__(self, sellers):
+        self.sellers = sellers
+        self.rebuild(())
+
+    def rebuild(self, listings):
+        self.by_id = {}
+        self.by_seller = {}    # seller_id -> {listing id: None}
+        self.fragments = {}    # listing id -> encode_json(projection)
+        for listing in listings:
+            self.update(listing)
+
+    def get(self, listing_id):
+        """Projection of an active listing, or None"""
+        return self.by_id.get(listing_id)
+
+    def fragment(self, listing_id):
+        """JSON bytes of an active listing's projection (cached), or None"""
+        fragment = self.fragments.get(listing_id)
+        if fragment is None:
+            view = self.by_id.get(listing_id)
+            if view is None:
+                return None
+            fragment = self.fragments[listing_id] = encode_json(view)
+        return fragment
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def update(self, listing):
+        """Re-project a listing after it changed"""
+        listing_id = listing['id']
+        if listing.get('status') != 'Active':
+            self.remove(listing_id)
+            return
+        previous = self.by_id.get(listing_id)
+        seller_id = listing.get('seller_id')
+        if previous is not None and previous.get('seller_id') != seller_id:
+            self.remove(listing_id)
+        self.by_id[listing_id] = public_listing(listing, self.sellers.get(seller_id))
+        self.fragments.pop(listing_id, None)
+        self.by_seller.setdefault(seller_id, {})[listing_id] = None
+
+    def remove(self, listing_id):
+        view = self.by_id.pop(listing_id, None)
+        if view is None:
+            return
+        self.fragments.pop(listing_id, None)
+        seller_id = view.get('seller_id')
+        bucket = self.by_seller.get(seller_id)
+        if bucket is not None:
+            bucket.pop(listing_id, None)
+            if not bucket:
+                del self.by_seller[seller_id]
+
+    def update_seller(self, seller_id):
+        """Re-join a seller's name and location into their listings"""
+        seller = self.sellers.get(seller_id) or {}
+        joined = {'seller_name': seller.get('shop_name', 'Unknown Seller'),
+                  'seller_location': seller.get('location', '')}
+        for listing_id in self.by_seller.get(seller_id, ()):
+            self.by_id[listing_id] = dict(self.by_id[listing_id], **joined)
+            self.fragments.pop(listing_id, None)
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def _bench_page(view, ids, total):
+    """List response body the way get_listings assembles it"""
+    meta = {'total': total, 'offset': 0, 'limit': len(ids), 'next_cursor': None}
+    return b'{"listings":[' + b','.join(view.fragment(i) for i in ids) + b'],' + encode_json(meta)[1:]
+
+def bench(count=5000, page_size=1000, rounds=50):
+    """Print list responses per second for jsonify and fragment joining"""
+    from flask import Flask, jsonify
+
+    sellers = {f'SELLER-{n}': {'shop_name': f'Shop {n}', 'location': 'Portland, OR'} for n in range(20)}
+    listings = [{
+        'id': f'LST-{n:08X}', 'seller_id': f'SELLER-{n % 20}', 'card_name': f'Card {n}',
+        'set_code': 'lea', 'set_name': 'Limited Edition Alpha', 'rarity': 'rare', 'colors': ['W', 'U'],
+        'type_line': 'Creature \u2014 Human Wizard', 'condition': 'NM', 'foil': n % 7 == 0,
+        'price': round(0.25 + n % 400 * 0.5, 2), 'quantity': 1 + n % 4, 'status': 'Active',
+        'image_url': f'https://cards.scryfall.io/normal/front/{n:032x}.jpg',
+        'content_hash': f'{n:064x}', 'synced_at': '2025-11-27T12:00:00', 'box': 'B1', 'call_number': str(n),
+    } for n in range(count)]
+    view = PublicListingView(sellers)
+    view.rebuild(listings)
+    ids = list(view.by_id)[:page_size]
+    app = Flask(__name__)
+
+    def rate(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return rounds / (time.perf_counter() - start)
+
+    def old():
+        page = {'listings': [view.get(i) for i in ids], 'total': count, 'offset': 0,
+                'limit': page_size, 'next_cursor': None}
+        return jsonify(page).get_data()
+
+    def cold():
+        view.fragments.clear()
+        return _bench_page(view, ids, count)
+
+    with app.app_context():
+        assert json.loads(old()) == json.loads(cold())
+        print(f'{count} listings, pages of {page_size}, {rounds} rounds '
+              f'(orjson {"installed" if orjson is not None else "not installed"})')
+        print(f'  jsonify          {rate(old):8.1f} responses/s')
+        print(f'  fragments, cold  {rate(cold):8.1f} responses/s')
+        _bench_page(view, ids, count)
+        print(f'  fragments, warm  {rate(lambda: _bench_page(view, ids, count)):8.1f} responses/s')
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'bench':
+        print(__doc__)
+        sys.exit(1)
+    bench(*[int(arg) for arg in sys.argv[2:5]])
@@ -0,0 +1,49 @@
+"""
+Test helpers
+
+marketplace_server loads its data at import time, so each scenario runs it
+in a fresh Python process against its own data directory.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENGINES = ('json', 'journal', 'sqlite')
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    return path
+
+@pytest.fixture
+def start_script(data_dir):
+    """start_script(source, engine, *args) starts source in a new process with
+    the repo importable and NEXUS_DATA_DIR set; returns the Popen"""
+    def start(source, engine, *args):
+        env = dict(os.environ, NEXUS_DATA_DIR=str(data_dir), NEXUS_STORAGE=engine,
+                   NEXUS_SCRYFALL_OFFLINE='1', PYTHONPATH=str(ROOT))
+        return subprocess.Popen([sys.executable, '-c', source, *map(str, args)], cwd=ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return start
+
+def script_result(proc, timeout=120):
+    """Last line of a finished script's output, parsed as JSON"""
+    out, err = proc.communicate(timeout=timeout)
+    assert proc.returncode == 0, err
+    return json.loads(out.strip().splitlines()[-1])
+
+@pytest.fixture
+def run_script(start_script):
+    """run_script(source, engine, *args) runs source to completion; returns
+    its last line of output, parsed as JSON"""
+    def run(source, engine, *args, timeout=120):
+        return script_result(start_script(source, engine, *args), timeout)
+    return run
@@ -0,0 +1,58 @@
+"""
+Cart expiry racing other workers' reads and deletes
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from marketplace_carts import CartStore
+from marketplace_storage import JournalStorage
+
+TTL = 3600
+
+class RefreshingStorage(JournalStorage):
+    """Journal storage that, like SQLite's before_write, applies another
+    worker's change when a transaction starts"""
+
+    before_write = None
+
+    @contextmanager
+    def transaction(self):
+        if self.before_write is not None:
+            self.before_write()
+        with super().transaction():
+            yield
+
+def stale_cart(storage, cart_id):
+    seen = (datetime.now() - timedelta(seconds=2 * TTL)).isoformat()
+    storage.put('carts', {'items': [], 'created': seen, 'seen': seen}, cart_id)
+
+def test_sweep_keeps_a_cart_read_by_another_worker(tmp_path):
+    storage = RefreshingStorage(tmp_path)
+    stale_cart(storage, 'CART-1')
+    stale_cart(storage, 'CART-2')
+    carts = CartStore(storage, ttl=TTL)
+
+    def other_worker():
+        # CART-1 was just read elsewhere, CART-2 already expired elsewhere
+        cart = dict(carts._carts['CART-1'], seen=datetime.now().isoformat())
+        carts.refresh('CART-1', cart)
+        carts.refresh('CART-2', None)
+    storage.before_write = other_worker
+
+    assert carts.sweep() == 0
+    assert carts.get('CART-1') is not None
+    assert carts.get('CART-2') is None
+
+def test_get_keeps_a_cart_read_by_another_worker(tmp_path):
+    storage = RefreshingStorage(tmp_path)
+    stale_cart(storage, 'CART-1')
+    carts = CartStore(storage, ttl=TTL)
+
+    def other_worker():
+        carts.refresh('CART-1', dict(carts._carts['CART-1'], seen=datetime.now().isoformat()))
+        storage.before_write = None
+    storage.before_write = other_worker
+
+    assert carts.get('CART-1') is not None
+    assert 'CART-1' in storage.load('carts')
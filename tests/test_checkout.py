@@ -0,0 +1,64 @@
+"""
+Concurrent checkout: many buyers racing for the last copies of a card
+"""
+
+import pytest
+
+from conftest import ENGINES
+
+BUYERS = 40
+COPIES = 3
+
+RACE = '''
+import json, sys, threading
+import marketplace_server as m
+
+buyers, copies = int(sys.argv[1]), int(sys.argv[2])
+client = m.app.test_client()
+seller = client.post('/api/seller/register', json={'shop_name': 'Shop', 'email': 's@example.com'}).get_json()
+client.post('/api/seller/sync', headers={'X-API-Key': seller['api_key']}, json={'listings': [
+    {'id': 'BOLT', 'card_name': 'Lightning Bolt', 'condition': 'NM', 'price': 2, 'quantity': copies,
+     'status': 'Active', 'image_url': 'https://cards.scryfall.io/bolt.jpg'}]})
+
+carts = []
+for i in range(buyers):
+    cart = m.app.test_client()
+    assert cart.post('/api/cart/add', json={'listing_id': 'BOLT', 'quantity': 1}).status_code == 200
+    carts.append(cart)
+
+start = threading.Barrier(buyers)
+codes = [None] * buyers
+def checkout(i):
+    start.wait()
+    codes[i] = carts[i].post('/api/checkout', json={'email': f'b{i}@example.com', 'name': 'Buyer'},
+                             headers={'Idempotency-Key': f'key-{i}'}).status_code
+threads = [threading.Thread(target=checkout, args=(i,)) for i in range(buyers)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+
+listing = m.listing_index.get('BOLT')
+print(json.dumps({'codes': codes, 'quantity': listing['quantity'], 'status': listing['status'],
+                  'sold': sum(item['quantity'] for order in m.order_index.by_id.values()
+                              for item in order['items'])}))
+'''
+
+RELOAD = '''
+import json
+import marketplace_server as m
+listing = m.listing_index.get('BOLT')
+print(json.dumps({'quantity': listing['quantity'], 'orders': len(m.order_index)}))
+'''
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_concurrent_checkouts_never_oversell(run_script, engine):
+    result = run_script(RACE, engine, BUYERS, COPIES)
+
+    assert sorted(result['codes']) == [200] * COPIES + [409] * (BUYERS - COPIES)
+    assert result['sold'] == COPIES
+    assert result['quantity'] == 0
+    assert result['status'] == 'Sold'
+
+    # What was persisted matches what was served
+    assert run_script(RELOAD, engine) == {'quantity': 0, 'orders': COPIES}
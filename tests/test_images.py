@@ -0,0 +1,49 @@
+"""
+/img: redirects on a cache miss, caching of versioned image URLs
+"""
+
+IMAGES = '''
+import json
+import marketplace_server as m
+
+# No downloads; the cache is filled by hand below
+m.image_cache.request = lambda url, small_url=None: None
+
+client = m.app.test_client()
+seller = client.post('/api/seller/register', json={'shop_name': 'Shop', 'email': 's@example.com'}).get_json()
+scryfall = 'https://cards.scryfall.io/normal/bolt.jpg'
+client.post('/api/seller/sync', headers={'X-API-Key': seller['api_key']}, json={'listings': [
+    {'id': 'EVIL', 'card_name': 'Bolt', 'condition': 'NM', 'price': 1, 'quantity': 1, 'status': 'Active',
+     'image_url': 'https://evil.example/bolt.jpg', 'image_small': scryfall},
+    {'id': 'SMALL', 'card_name': 'Bolt', 'condition': 'LP', 'price': 1, 'quantity': 1, 'status': 'Active',
+     'image_url': scryfall, 'image_small': 'https://evil.example/small.jpg'},
+    {'id': 'BOLT', 'card_name': 'Bolt', 'condition': 'MP', 'price': 1, 'quantity': 1, 'status': 'Active',
+     'image_url': 'https://cards.scryfall.io/normal/other.jpg'}]})
+
+def get(path):
+    r = client.get(path)
+    return [r.status_code, r.headers.get('Location'), r.headers.get('Cache-Control')]
+
+result = {'evil': get('/img/EVIL/normal'), 'evil_thumb': get('/img/EVIL/thumb'),
+          'small_thumb': get('/img/SMALL/thumb')}
+
+digest, ext = m.image_cache.store(b'\\x89PNG\\r\\n\\x1a\\n' + bytes(64))
+m.image_cache._ref('https://cards.scryfall.io/normal/other.jpg', 'normal', digest, ext)
+version = client.get('/api/listings/BOLT').get_json()['image_version']
+result['current'] = get(f'/img/BOLT/normal?v={version}')
+result['outdated'] = get('/img/BOLT/normal?v=0123456789abcdef')
+result['unversioned'] = get('/img/BOLT/normal')
+print(json.dumps(result))
+'''
+
+def test_image_redirects_and_caching(run_script):
+    result = run_script(IMAGES, 'json')
+
+    # Seller-supplied URLs off the image sources are never redirected to
+    assert result['evil'] == [404, None, None]
+    assert result['evil_thumb'] == [302, 'https://cards.scryfall.io/normal/bolt.jpg', 'no-store']
+    assert result['small_thumb'] == [302, 'https://cards.scryfall.io/normal/bolt.jpg', 'no-store']
+
+    assert result['current'][::2] == [200, 'public, max-age=31536000, immutable']
+    assert result['outdated'][::2] == [200, 'no-cache']
+    assert result['unversioned'][::2] == [200, 'no-cache']
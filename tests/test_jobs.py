@@ -0,0 +1,43 @@
+"""
+Background jobs: one at a time per owner, also across runners (processes)
+sharing a jobs database
+"""
+
+import threading
+import time
+
+from marketplace_jobs import JobRunner
+
+def wait(runner, job, timeout=10):
+    deadline = time.time() + timeout
+    while runner.get(job.id).finished is None:
+        assert time.time() < deadline, 'job did not finish'
+        time.sleep(0.01)
+
+def test_runners_sharing_a_database_run_an_owners_jobs_one_at_a_time(tmp_path):
+    runners = [JobRunner(workers=2, db_path=tmp_path / 'jobs.db') for _ in range(2)]
+    spans = []
+    lock = threading.Lock()
+
+    def job_fn(job):
+        start = time.time()
+        time.sleep(0.3)
+        with lock:
+            spans.append((job.owner, start, time.time()))
+
+    jobs = [(runner, runner.submit(owner, 'sync', job_fn)) for runner in runners for owner in ('A', 'B')]
+    for runner, job in jobs:
+        wait(runner, job)
+
+    for owner in ('A', 'B'):
+        (_, start1, end1), (_, start2, end2) = sorted(s for s in spans if s[0] == owner)
+        assert end1 <= start2
+
+def test_claim_of_a_dead_process_is_taken_over(tmp_path):
+    runner = JobRunner(db_path=tmp_path / 'jobs.db')
+    # Above the largest pid Linux hands out
+    runner._conn.execute("INSERT INTO claims (owner, job_id, runner, pid, heartbeat) "
+                         "VALUES ('A', 'JOB-GONE', 'other', ?, ?)", (2 ** 22 + 1, time.time()))
+    job = runner.submit('A', 'sync', lambda job: 'done')
+    wait(runner, job)
+    assert runner.get(job.id).result == 'done'
@@ -0,0 +1,83 @@
+"""
+Several worker processes sharing one SQLite database, as under gunicorn
+"""
+
+import json
+
+from conftest import script_result
+
+WORKERS = 4
+ROUNDS = 25
+LISTINGS = 10
+STOCK = 5
+
+SETUP = '''
+import json, sys
+import marketplace_server as m
+
+client = m.app.test_client()
+seller = client.post('/api/seller/register', json={'shop_name': 'Shop', 'email': 's@example.com'}).get_json()
+client.post('/api/seller/sync', headers={'X-API-Key': seller['api_key']}, json={'listings': [
+    {'id': f'L{i}', 'card_name': f'Card {i}', 'condition': 'NM', 'price': 2, 'quantity': int(sys.argv[2]),
+     'status': 'Active', 'image_url': 'https://cards.scryfall.io/card.jpg'} for i in range(int(sys.argv[1]))]})
+print(json.dumps({'api_key': seller['api_key'], 'seller_id': seller['seller_id'],
+                  'version': m.sellers[seller['seller_id']]['sync_version']}))
+'''
+
+# Each round buys a random listing and adds one listing by delta sync
+# (retrying on version conflicts), racing the other workers for both
+WORKER = '''
+import json, random, sys
+import marketplace_server as m
+
+worker, rounds, api_key, ids = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3], json.loads(sys.argv[4])
+headers = {'X-API-Key': api_key}
+rnd = random.Random(worker)
+counts = {'bought': 0, 'refused': 0, 'synced': 0, 'errors': 0}
+for r in range(rounds):
+    buyer = m.app.test_client()
+    buyer.post('/api/cart/add', json={'listing_id': rnd.choice(ids)})
+    code = buyer.post('/api/checkout', json={'email': f'w{worker}@example.com', 'name': 'Buyer'}).status_code
+    counts['bought' if code == 200 else 'refused' if code in (400, 409) else 'errors'] += 1
+    for attempt in range(100):
+        client = m.app.test_client()
+        version = client.get('/api/seller/sync/manifest', headers=headers).get_json()['version']
+        code = client.post('/api/seller/sync/delta', headers=headers, json={'base_version': version, 'upserts': [
+            {'card_name': f'W{worker}-{r}', 'condition': 'NM', 'price': 1, 'quantity': 1,
+             'status': 'Active', 'image_url': 'https://cards.scryfall.io/card.jpg'}]}).status_code
+        if code != 409:
+            break
+    counts['synced' if code == 200 else 'errors'] += 1
+print(json.dumps(counts))
+'''
+
+CHECK = '''
+import json, sys
+import marketplace_server as m
+
+seller_id, ids = sys.argv[1], json.loads(sys.argv[2])
+print(json.dumps({
+    'sold': sum(int(sys.argv[3]) - m.listing_index.get(i)['quantity'] for i in ids),
+    'negative': [i for i in ids if m.listing_index.get(i)['quantity'] < 0],
+    'orders': len(m.order_index),
+    'listings': m.listing_index.count(seller_id),
+    'version': m.sellers[seller_id]['sync_version'],
+}))
+'''
+
+def test_workers_lose_no_updates(run_script, start_script):
+    setup = run_script(SETUP, 'sqlite', LISTINGS, STOCK)
+    ids = json.dumps([f'L{i}' for i in range(LISTINGS)])
+
+    workers = [start_script(WORKER, 'sqlite', n, ROUNDS, setup['api_key'], ids) for n in range(WORKERS)]
+    results = [script_result(w, timeout=300) for w in workers]
+    total = {key: sum(r[key] for r in results) for key in results[0]}
+    assert total['errors'] == 0
+
+    # A fresh process sees every order and every sync, and no listing
+    # sold more copies than it had
+    check = run_script(CHECK, 'sqlite', setup['seller_id'], ids, STOCK)
+    assert check['negative'] == []
+    assert check['orders'] == total['bought'] == check['sold']
+    assert check['listings'] - LISTINGS == total['synced'] == WORKERS * ROUNDS
+    assert check['version'] - setup['version'] == total['synced']
@@ -0,0 +1,45 @@
+"""
+Keyset pagination across index rebuilds (restarts, other workers)
+"""
+
+import random
+
+import pytest
+
+from marketplace_index import ListingIndex
+from marketplace_query import ListingQuery, run_query
+
+def make_listings(count=60):
+    # Several listings share a listed_at time (one sync) and a card name
+    return [{'id': f'LST-{n:08X}', 'seller_id': 'SELLER-1', 'card_name': f'Goblin {n % 7}',
+             'condition': 'NM', 'price': n % 5, 'quantity': 1, 'status': 'Active',
+             'listed_at': f'2025-11-27T12:00:{n // 10:02d}.000000'} for n in range(count)]
+
+def pages(listings, query, limit, rebuild):
+    """Every page of a query, rebuilding the index before each next page"""
+    index = ListingIndex(listings)
+    seen, cursor = [], None
+    while True:
+        page, total, cursor, _ = run_query(index, query, limit=limit, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            return seen, total
+        if rebuild:
+            # Another process indexes the same listings in a different order
+            shuffled = list(listings)
+            random.Random(len(seen)).shuffle(shuffled)
+            index = ListingIndex(shuffled)
+
+@pytest.mark.parametrize('query', [
+    ListingQuery(),
+    ListingQuery(q='goblin'),
+    ListingQuery(sort='price_desc'),
+    ListingQuery(q='goblin', sort='price_asc'),
+], ids=['listed', 'relevance', 'price_desc', 'filtered'])
+def test_cursor_pages_survive_index_rebuilds(query):
+    listings = make_listings()
+    expected, total = pages(listings, query, limit=len(listings), rebuild=False)
+    seen, _ = pages(listings, query, limit=7, rebuild=True)
+
+    assert len(expected) == total == len(listings)
+    assert seen == expected
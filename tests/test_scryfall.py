@@ -0,0 +1,112 @@
+"""
+ScryfallClient against a local stub of the Scryfall API
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from marketplace_scryfall import COLLECTION_LIMIT, ScryfallClient
+
+class DictCache:
+    """The lookup()/put() interface of marketplace_cache.ScryfallCache"""
+
+    def __init__(self):
+        self.data = {}
+
+    def lookup(self, key):
+        return key in self.data, self.data.get(key)
+
+    def put(self, key, data):
+        self.data[key] = data
+
+def card(name):
+    return {'name': name, 'set': 'lea', 'type_line': 'Instant',
+            'image_uris': {'normal': f'https://cards.scryfall.io/normal/{name}.jpg'}}
+
+class StubScryfall(BaseHTTPRequestHandler):
+    # Filled in by the fixture: the requests seen as (time, path, body)
+    requests = None
+    named_delay = 0
+
+    def reply(self, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests.append((time.monotonic(), self.path, body))
+        self.reply({'data': [card(i['name']) for i in body['identifiers']]})
+
+    def do_GET(self):
+        self.requests.append((time.monotonic(), self.path, None))
+        time.sleep(self.named_delay)
+        self.reply(card('Lightning Bolt'))
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def scryfall():
+    """(base url, list of requests the stub received)"""
+    requests = []
+    handler = type('Handler', (StubScryfall,), {'requests': requests, 'named_delay': 0.3})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}', requests
+    server.shutdown()
+    server.server_close()
+
+def test_collection_lookups_are_chunked(scryfall):
+    base_url, requests = scryfall
+    client = ScryfallClient(DictCache(), base_url=base_url, rate=1000)
+    names = [f'Card {n}' for n in range(2 * COLLECTION_LIMIT + 50)]
+
+    results = client.collection([(name, None) for name in names])
+
+    assert [len(body['identifiers']) for _, path, body in requests] == [75, 75, 50]
+    assert {path for _, path, _ in requests} == {'/cards/collection'}
+    assert len(results) == len(names) and all(results.values())
+
+    # Everything is cached now
+    client.collection([(name, None) for name in names])
+    assert len(requests) == 3
+
+def test_concurrent_lookups_of_one_card_share_a_request(scryfall):
+    base_url, requests = scryfall
+    client = ScryfallClient(DictCache(), base_url=base_url, rate=1000)
+    start = threading.Barrier(10)
+    results = []
+
+    def lookup():
+        start.wait()
+        results.append(client.named('Lightning Bolt'))
+    threads = [threading.Thread(target=lookup) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(requests) == 1
+    assert len(results) == 10 and all(r['type_line'] == 'Instant' for r in results)
+    assert client.stats['coalesced'] == 9
+
+def test_requests_are_rate_limited(scryfall):
+    base_url, requests = scryfall
+    client = ScryfallClient(DictCache(), base_url=base_url, rate=10, burst=1)
+
+    client.collection([(f'Card {n}', None) for n in range(4 * COLLECTION_LIMIT)])
+
+    times = [t for t, _, _ in requests]
+    assert len(times) == 4
+    # One request per 0.1s once the single saved token is spent
+    assert all(b - a >= 0.09 for a, b in zip(times, times[1:]))
+    assert client.stats['throttled_seconds'] > 0
@@ -0,0 +1,48 @@
+"""
+Journal storage: loads racing background compaction, crash leftovers
+"""
+
+import threading
+
+import marketplace_storage
+from marketplace_storage import JournalStorage
+
+RECORDS = 100
+
+def test_load_during_compaction_sees_every_record(tmp_path, monkeypatch):
+    storage = JournalStorage(tmp_path)
+    storage.load('sellers')
+    for n in range(RECORDS):
+        storage.put('sellers', {'shop_name': f'Shop {n}'}, f'SELLER-{n}')
+    with storage._lock:
+        storage._files.pop('sellers').close()
+        storage.journal_path('sellers').rename(storage.journal_path('sellers', old=True))
+
+    # Run the compaction right after load() has read the (empty) snapshot,
+    # giving it half a second to finish before load() goes on to the journals
+    load_json = marketplace_storage.load_json
+    compaction = threading.Thread(target=storage.compact, args=('sellers',))
+    def load_then_compact(path, default=None):
+        data = load_json(path, default)
+        if compaction.ident is None:
+            compaction.start()
+            compaction.join(0.5)
+        return data
+    monkeypatch.setattr(marketplace_storage, 'load_json', load_then_compact)
+    loaded = storage.load('sellers')
+    monkeypatch.undo()
+    compaction.join()
+
+    assert len(loaded) == RECORDS
+    storage.close()
+    assert len(JournalStorage(tmp_path).load('sellers')) == RECORDS
+
+def test_leftover_snapshot_temp_files_are_removed_on_open(tmp_path):
+    leftover = tmp_path / 'listings.json.1234.5678.tmp'
+    leftover.write_text('[')
+    unrelated = tmp_path / 'notes.tmp'
+    unrelated.write_text('keep')
+
+    JournalStorage(tmp_path).close()
+    assert not leftover.exists()
+    assert unrelated.exists()
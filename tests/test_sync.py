@@ -0,0 +1,88 @@
+"""
+Seller sync: version bumps, delta body validation
+"""
+
+import pytest
+
+from conftest import ENGINES
+
+VERSIONS = '''
+import json, os
+os.environ['NEXUS_SYNC_BATCH_SIZE'] = '2'
+import marketplace_server as m
+
+client = m.app.test_client()
+seller = client.post('/api/seller/register', json={'shop_name': 'Shop', 'email': 's@example.com'}).get_json()
+headers = {'X-API-Key': seller['api_key']}
+
+def version():
+    return client.get('/api/seller/sync/manifest', headers=headers).get_json()['version']
+
+def listing(n):
+    return json.dumps({'id': f'L{n}', 'card_name': f'Card {n}', 'condition': 'NM', 'price': 1,
+                       'quantity': 1, 'status': 'Active'})
+
+def stream(body, mode='merge'):
+    return client.post(f'/api/v2/seller/sync?mode={mode}', data=body, headers=headers,
+                       content_type='application/x-ndjson').status_code
+
+result = {}
+client.post('/api/seller/sync', headers=headers, json={'listings': []})
+stream('')
+result['empty'] = version()
+
+# Two batches commit before the body turns out to be invalid
+result['broken_code'] = stream('\\n'.join(listing(n) for n in range(4)) + '\\n{not json\\n')
+result['broken'] = version()
+
+client.post('/api/seller/sync', headers=headers, json={'listings': [json.loads(listing(9))]})
+result['v1'] = version()
+stream('', mode='replace')
+result['replace_all'] = version()
+stream('', mode='replace')
+result['replace_none'] = version()
+print(json.dumps(result))
+'''
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_sync_version_bumps_only_for_changes(run_script, engine):
+    assert run_script(VERSIONS, engine) == {
+        'empty': 0,
+        'broken_code': 400, 'broken': 1,
+        'v1': 2,
+        'replace_all': 3,
+        'replace_none': 3,
+    }
+
+DELTA = '''
+import json
+import marketplace_server as m
+
+client = m.app.test_client()
+seller = client.post('/api/seller/register', json={'shop_name': 'Shop', 'email': 's@example.com'}).get_json()
+headers = {'X-API-Key': seller['api_key']}
+bolt = {'id': 'BOLT', 'card_name': 'Lightning Bolt', 'condition': 'NM', 'price': 2, 'quantity': 1,
+        'status': 'Active'}
+bodies = [
+    ['not', 'an', 'object'],
+    'abc',
+    {'base_version': 0, 'upserts': 'abc'},
+    {'base_version': 0, 'upserts': [bolt, 'abc']},
+    {'base_version': 0, 'upserts': {'id': 'BOLT'}},
+    {'base_version': 0, 'upserts': [bolt], 'deletes': [['x']]},
+    {'base_version': 0, 'upserts': [bolt], 'deletes': 'BOLT'},
+    {'base_version': 0, 'upserts': [dict(bolt, card_name=['x'])]},
+    # Malformed beats a stale version
+    {'base_version': 5, 'upserts': 'abc'},
+]
+codes = [client.post('/api/seller/sync/delta', json=body, headers=headers).status_code for body in bodies]
+manifest = client.get('/api/seller/sync/manifest', headers=headers).get_json()
+print(json.dumps({'codes': codes, 'version': manifest['version'], 'listings': manifest['total']}))
+'''
+
+def test_sync_delta_rejects_malformed_bodies(run_script):
+    result = run_script(DELTA, 'json')
+
+    assert result['codes'] == [400] * 9
+    assert result['version'] == 0
+    assert result['listings'] == 0